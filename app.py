@@ -1,13 +1,25 @@
 import streamlit as st
 from src.empirical_rag_pipeline import EmpiricalRAGPipeline
+from src.document_watcher import DocumentWatcher
 import os
 
 st.set_page_config(page_title="RAG System with Empirical Data Modelling", layout="wide")
 
 DOCUMENTS_PATH = os.path.join(os.path.dirname(__file__), "documents")
+LOAD_WORKERS = int(os.environ.get("LOAD_WORKERS", os.cpu_count() or 1))
+EXTRACTION_WORKERS = int(os.environ.get("EXTRACTION_WORKERS", os.cpu_count() or 1))
+CHUNK_UNIT = os.environ.get("CHUNK_UNIT", "chars")
+CHUNK_BOUNDARIES = os.environ.get("CHUNK_BOUNDARIES", "fixed")
 
 if 'rag_pipeline' not in st.session_state:
-    st.session_state.rag_pipeline = EmpiricalRAGPipeline(DOCUMENTS_PATH)
+    st.session_state.rag_pipeline = EmpiricalRAGPipeline(
+        DOCUMENTS_PATH,
+        load_workers=LOAD_WORKERS,
+        extraction_workers=EXTRACTION_WORKERS,
+        chunk_unit=CHUNK_UNIT,
+        boundary_mode=CHUNK_BOUNDARIES
+    )
+    st.session_state.document_watcher = DocumentWatcher(st.session_state.rag_pipeline)
     st.session_state.initialized = False
     st.session_state.chat_history = []
 
@@ -16,14 +28,17 @@ st.title("Document Q&A with Empirical Data Modelling")
 with st.sidebar:
     st.header("Document Management")
     
+    full_rebuild = st.checkbox("Full rebuild", value=False)
+    
     if st.button("Load/Reload Documents"):
         with st.spinner("Loading documents with Empirical Data Modelling..."):
-            result = st.session_state.rag_pipeline.reload_documents()
+            result = st.session_state.rag_pipeline.reload_documents(force=full_rebuild)
             st.session_state.initialized = result['success']
             
             if result['success']:
                 st.success(f"Loaded {result['document_count']} documents")
-                st.info(f"Total Chunks: {result['total_chunks']}")
+                st.info(f"Indexed: {result['documents_indexed']}, Unchanged: {result['documents_unchanged']}, Removed: {result['documents_removed']}")
+                st.info(f"Total Chunks: {result['total_chunks']} (reused: {result['chunks_reused']}, near-duplicates: {result['near_duplicates']})")
                 st.info(f"Entities Extracted: {result['total_entities']}")
                 st.info(f"Facts Extracted: {result['total_facts']}")
                 
@@ -31,9 +46,32 @@ with st.sidebar:
                     st.subheader("Entities by Type")
                     for etype, count in result['entities_by_type'].items():
                         st.write(f"- {etype}: {count}")
+                
+                report = result.get('ingestion_report')
+                if report and report['files']:
+                    with st.expander("Ingestion Report"):
+                        for stage, stage_stats in report['stages'].items():
+                            st.write(f"- {stage}: {stage_stats['seconds']:.2f}s")
+                        st.write("Slowest files:")
+                        for file_stats in report['files'][:5]:
+                            st.write(f"- {file_stats['filename']}: {file_stats['total_seconds']:.2f}s")
+                
+                for error in result.get('load_errors', []):
+                    st.warning(f"Could not load {error['filename']}: {error['error']}")
             else:
                 st.error(result['message'])
     
+    watcher = st.session_state.document_watcher
+    if st.checkbox("Watch documents folder", value=watcher.is_running()):
+        watcher.start()
+        if watcher.last_result:
+            last = watcher.last_result
+            st.caption(f"Last sync: {last['documents_indexed']} indexed, {last['documents_removed']} removed")
+        if watcher.last_error:
+            st.warning(f"Watcher error: {watcher.last_error}")
+    elif watcher.is_running():
+        watcher.stop()
+    
     st.divider()
     
     if st.session_state.initialized:
@@ -51,7 +89,7 @@ with st.sidebar:
     
     st.divider()
     st.header("Supported Formats")
-    st.write("PDF, DOCX, Excel, CSV, TXT")
+    st.write("PDF, DOCX, Excel, CSV, TXT, ZIP")
 
 for chat in st.session_state.chat_history:
     with st.chat_message("user"):
@@ -126,7 +164,7 @@ if question:
             if result.get('sources'):
                 with st.expander("Sources"):
                     for source in result['sources']:
-                        st.write(f"- {source['filename']} (Relevance: {source['relevance']:.2f})")
+                        st.write(f"- {source['filename']}, {source['unit']} {source['page']} (Relevance: {source['relevance']:.2f})")
             
             if result.get('empirical_analysis'):
                 with st.expander("Empirical Data Model Analysis"):
@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.entity_extractor import Entity, EntityExtractor
+
+ROW_COUNTS = [250, 500, 1000, 2000]
+ROW = ("Name_of_Entity=Branch {i}; Date=30 Jun 2025; Report_Date=2025-06-30; Due=6/30/2025; "
+       "Outstanding=Rs. {i},250.00; Settled=INR {i}00; Case=GR-{i}; ID 12/03/2024; status pending; HR department\n")
+
+
+def quadratic_deduplicate(entities):
+    entities.sort(key=lambda e: (e.start, -e.confidence))
+    result = []
+    for entity in entities:
+        if all(entity.end <= existing.start or entity.start >= existing.end for existing in result):
+            result.append(entity)
+    return result
+
+
+def best_of(fn, entities, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        candidates = list(entities)
+        started = time.perf_counter()
+        result = fn(candidates)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+extractor = EntityExtractor()
+print(f"{'rows':>6} {'entities':>9} {'kept':>7} {'quadratic ms':>13} {'sweep ms':>9} {'sweep us/entity':>16}")
+for rows in ROW_COUNTS:
+    text = ''.join(ROW.format(i=i) for i in range(rows))
+    entities = [Entity(*fields) for fields in extractor.scanner.scan(text)]
+
+    quadratic_seconds, expected = best_of(quadratic_deduplicate, entities, repeats=1)
+    sweep_seconds, result = best_of(extractor._deduplicate_entities, entities)
+    if result != expected:
+        sys.exit(f"Sweep dedup differs from quadratic dedup at {rows} rows")
+
+    print(f"{rows:>6} {len(entities):>9} {len(result):>7} {quadratic_seconds * 1000:>13.1f} {sweep_seconds * 1000:>9.2f} "
+          f"{sweep_seconds * 1e6 / len(entities):>16.3f}")
@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.chunking import HierarchicalChunker
+from src.document_loader import DocumentLoader
+from src.entity_extractor import EntityExtractor
+
+DOCUMENTS_DIR = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), '..', 'documents')
+REPEATS = 5
+
+loader = DocumentLoader(DOCUMENTS_DIR)
+chunker = HierarchicalChunker()
+texts = []
+for file_path in loader.list_files():
+    for doc in loader.open_file_pages(file_path):
+        texts.extend(dict.fromkeys(chunk['parent_text'] for chunk in chunker.iter_document_chunks(doc)))
+
+print(f"Corpus: {len(texts)} parent chunks, {sum(len(text) for text in texts):,} characters")
+
+extractors = {
+    'per-pattern': EntityExtractor(use_scanner=False),
+    'scanner': EntityExtractor(use_scanner=True)
+}
+
+results = {name: [extractor.extract_entities(text) for text in texts] for name, extractor in extractors.items()}
+if results['per-pattern'] != results['scanner']:
+    sys.exit("Scanner output differs from per-pattern output")
+print(f"Identical output: {sum(len(entities) for entities in results['scanner'])} entities")
+
+timings = {}
+for name, extractor in extractors.items():
+    best = float('inf')
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        for text in texts:
+            extractor.extract_entities(text)
+        best = min(best, time.perf_counter() - started)
+    timings[name] = best
+    print(f"{name:>12}: {best * 1000:8.1f} ms (best of {REPEATS})")
+
+print(f"Speedup: {timings['per-pattern'] / timings['scanner']:.1f}x")
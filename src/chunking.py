@@ -1,56 +1,253 @@
-from typing import List, Dict
-import uuid
+import hashlib
+import re
+import zlib
+from array import array
+from bisect import bisect_right
+from itertools import islice
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from src.token_counter import TokenCounter
+
+NON_SPACE = re.compile(r"\S")
+BREAK = re.compile(r"[.!?][\"')\]]*\s+|\n\s*")
+BOUNDARY_MODES = ('fixed', 'content')
+
+
+def normalize_content(text: str) -> str:
+    return " ".join(text.split())
+
+
+def content_hash(namespace: str, text: str) -> str:
+    return hashlib.sha256(f"{namespace}\0{normalize_content(text)}".encode('utf-8')).hexdigest()[:24]
+
+
+def parent_id_for(filename: str, parent_text: str) -> str:
+    return f"{filename}_parent_{content_hash(filename, parent_text)}"
+
+
+def chunk_id_for(parent_id: str, child_text: str) -> str:
+    # children are namespaced by their parent, so a reused child never
+    # points at a parent that was edited away
+    return f"chunk_{content_hash(parent_id, child_text)}"
+
+
+class ChunkSet:
+    __slots__ = ('buffer', 'filename', 'counts_tokens', 'parent_starts', 'parent_ends', 'parent_tokens', 'child_starts', 'child_ends', 'child_parents', 'child_tokens')
+    
+    def __init__(self, buffer: str, filename: str, counts_tokens: bool = False):
+        self.buffer = buffer
+        self.filename = filename
+        self.counts_tokens = counts_tokens
+        self.parent_starts = array('q')
+        self.parent_ends = array('q')
+        self.parent_tokens = array('q')
+        self.child_starts = array('q')
+        self.child_ends = array('q')
+        self.child_parents = array('q')
+        self.child_tokens = array('q')
+    
+    def __len__(self) -> int:
+        return len(self.child_starts)
+    
+    def iter_parent(self, parent_index: int, first: int) -> Iterator[Dict]:
+        parent_text = self.parent_text(parent_index)
+        parent_id = parent_id_for(self.filename, parent_text)
+        for index in range(first, len(self)):
+            yield self.chunk(index, parent_text, parent_id)
+    
+    def __iter__(self) -> Iterator[Dict]:
+        parent_index = -1
+        parent_text = ""
+        parent_id = ""
+        for index in range(len(self)):
+            if self.child_parents[index] != parent_index:
+                parent_index = self.child_parents[index]
+                parent_text = self.parent_text(parent_index)
+                parent_id = parent_id_for(self.filename, parent_text)
+            yield self.chunk(index, parent_text, parent_id)
+    
+    @property
+    def parent_count(self) -> int:
+        return len(self.parent_starts)
+    
+    def add_parent(self, start: int, end: int, token_count: int = 0) -> int:
+        self.parent_starts.append(start)
+        self.parent_ends.append(end)
+        self.parent_tokens.append(token_count)
+        return len(self.parent_starts) - 1
+    
+    def add_child(self, start: int, end: int, parent_index: int, token_count: int = 0):
+        self.child_starts.append(start)
+        self.child_ends.append(end)
+        self.child_parents.append(parent_index)
+        self.child_tokens.append(token_count)
+    
+    def parent_text(self, parent_index: int) -> str:
+        return self.buffer[self.parent_starts[parent_index]:self.parent_ends[parent_index]]
+    
+    def child_text(self, index: int) -> str:
+        return self.buffer[self.child_starts[index]:self.child_ends[index]]
+    
+    def chunk(self, index: int, parent_text: Optional[str] = None, parent_id: Optional[str] = None) -> Dict:
+        parent_index = self.child_parents[index]
+        parent_text = self.parent_text(parent_index) if parent_text is None else parent_text
+        parent_id = parent_id or parent_id_for(self.filename, parent_text)
+        child_text = self.child_text(index)
+        chunk = {
+            'chunk_id': chunk_id_for(parent_id, child_text),
+            'parent_id': parent_id,
+            'child_text': child_text,
+            'parent_text': parent_text
+        }
+        if self.counts_tokens:
+            chunk['token_count'] = self.child_tokens[index]
+            chunk['parent_token_count'] = self.parent_tokens[parent_index]
+        return chunk
 
 
 class HierarchicalChunker:
-    def __init__(self, parent_chunk_size: int = 2000, child_chunk_size: int = 500, overlap: int = 100):
+    def __init__(self, parent_chunk_size: int = 2000, child_chunk_size: int = 500, overlap: int = 100,
+                 token_counter: Optional[TokenCounter] = None, boundary_mode: str = 'fixed',
+                 boundary_window: int = 32, boundary_divisor: int = 4):
+        if boundary_mode not in BOUNDARY_MODES:
+            raise ValueError(f"Unknown boundary mode: {boundary_mode}")
+        if boundary_mode == 'content' and token_counter is not None:
+            raise ValueError("Content-defined boundaries are measured in characters")
         self.parent_chunk_size = parent_chunk_size
         self.child_chunk_size = child_chunk_size
         self.overlap = overlap
+        self.token_counter = token_counter
+        self.boundary_mode = boundary_mode
+        self.boundary_window = boundary_window
+        self.boundary_divisor = boundary_divisor
     
-    def create_chunks(self, text: str, chunk_size: int, overlap: int) -> List[str]:
-        chunks = []
-        start = 0
-        text_length = len(text)
+    @classmethod
+    def for_tokens(cls, token_counter: TokenCounter, parent_chunk_size: int = 384, child_chunk_size: int = 128,
+                   overlap: int = 32, boundary_mode: str = 'fixed') -> 'HierarchicalChunker':
+        return cls(parent_chunk_size, child_chunk_size, overlap, token_counter=token_counter, boundary_mode=boundary_mode)
+    
+    @property
+    def size_unit(self) -> str:
+        return 'tokens' if self.token_counter is not None else 'chars'
+    
+    def create_chunk_spans(self, text: str, chunk_size: int, overlap: int,
+                           start: int = 0, stop: Optional[int] = None) -> List[Tuple[int, int]]:
+        return list(self.iter_chunk_spans(text, chunk_size, overlap, start, stop))
+    
+    def iter_chunk_spans(self, text: str, chunk_size: int, overlap: int,
+                         start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        if self.boundary_mode == 'content':
+            yield from self.iter_content_spans(text, chunk_size, overlap, start, stop)
+            return
+        
+        text_length = len(text) if stop is None else stop
         
         while start < text_length:
-            end = start + chunk_size
-            chunk = text[start:end]
-            if chunk.strip():
-                chunks.append(chunk)
-            start = end - overlap
+            end = min(start + chunk_size, text_length)
+            if NON_SPACE.search(text, start, end):
+                yield start, end
+            start = start + chunk_size - overlap
+    
+    def create_content_spans(self, text: str, chunk_size: int, overlap: int, start: int = 0,
+                             stop: Optional[int] = None, floor: Optional[int] = None) -> List[Tuple[int, int]]:
+        return list(self.iter_content_spans(text, chunk_size, overlap, start, stop, floor))
+    
+    def iter_content_spans(self, text: str, chunk_size: int, overlap: int, start: int = 0,
+                           stop: Optional[int] = None, floor: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        text_length = len(text) if stop is None else stop
+        floor = start if floor is None else floor
+        
+        while start < text_length:
+            end = self._next_boundary(text, start, text_length, chunk_size - overlap)
+            span_start = max(start - overlap, floor)
+            if NON_SPACE.search(text, span_start, end):
+                yield span_start, end
+            start = end
+    
+    def _next_boundary(self, text: str, start: int, stop: int, max_size: int) -> int:
+        limit = min(start + max_size, stop)
+        if limit == stop:
+            return stop
+        
+        min_size = max_size // 2
+        fallback = None
+        for match in BREAK.finditer(text, start, limit):
+            end = match.end()
+            if end - start < min_size:
+                continue
+            window = text[max(end - self.boundary_window, 0):end].encode('utf-8')
+            if zlib.crc32(window) % self.boundary_divisor == 0:
+                return end
+            fallback = end
+        return fallback or limit
+    
+    def create_token_spans(self, text: str, token_starts: array, token_ends: array, chunk_size: int, overlap: int,
+                           first: int = 0, last: Optional[int] = None) -> List[Tuple[int, int]]:
+        spans = []
+        token_count = len(token_starts) if last is None else last
         
-        return chunks
+        while first < token_count:
+            end = min(first + chunk_size, token_count)
+            if NON_SPACE.search(text, token_starts[first], token_ends[end - 1]):
+                spans.append((first, end))
+            first = first + chunk_size - overlap
+        
+        return spans
+    
+    def create_chunk_set(self, content: str, filename: str) -> ChunkSet:
+        if self.token_counter is not None:
+            return self.create_token_chunk_set(content, filename)
+        
+        chunk_set = ChunkSet(content, filename)
+        
+        for parent_start, parent_end in self.iter_chunk_spans(content, self.parent_chunk_size, self.overlap):
+            self._add_parent(chunk_set, parent_start, parent_end)
+        
+        return chunk_set
+    
+    def _add_parent(self, chunk_set: ChunkSet, parent_start: int, parent_end: int) -> int:
+        parent_index = chunk_set.add_parent(parent_start, parent_end)
+        for start, end in self.iter_chunk_spans(chunk_set.buffer, self.child_chunk_size, self.overlap // 2,
+                                                parent_start, parent_end):
+            chunk_set.add_child(start, end, parent_index)
+        return parent_index
+    
+    def create_token_chunk_set(self, content: str, filename: str) -> ChunkSet:
+        chunk_set = ChunkSet(content, filename, counts_tokens=True)
+        for _ in self._iter_token_parents(chunk_set):
+            pass
+        return chunk_set
+    
+    def _iter_token_parents(self, chunk_set: ChunkSet) -> Iterator[Tuple[int, int]]:
+        content = chunk_set.buffer
+        offsets = self.token_counter.offsets_batch([content])[0]
+        token_starts = array('q', (start for start, _ in offsets))
+        token_ends = array('q', (end for _, end in offsets))
+        
+        for first, last in self.create_token_spans(content, token_starts, token_ends, self.parent_chunk_size, self.overlap):
+            first_child = len(chunk_set)
+            parent_index = chunk_set.add_parent(token_starts[first], token_ends[last - 1], last - first)
+            for child_first, child_last in self.create_token_spans(content, token_starts, token_ends, self.child_chunk_size,
+                                                                   self.overlap // 2, first, last):
+                chunk_set.add_child(token_starts[child_first], token_ends[child_last - 1], parent_index,
+                                    child_last - child_first)
+            yield parent_index, first_child
+    
+    def create_chunks(self, text: str, chunk_size: int, overlap: int) -> List[str]:
+        return [text[start:end] for start, end in self.create_chunk_spans(text, chunk_size, overlap)]
     
-    def create_hierarchical_chunks(self, documents: List[Dict]) -> Dict:
+    def create_hierarchical_chunks(self, documents: Iterable[Dict]) -> Dict:
         parent_chunks = {}
         child_chunks = []
         child_to_parent_map = {}
         
-        for doc in documents:
-            content = doc['content']
-            filename = doc['filename']
-            
-            parents = self.create_chunks(content, self.parent_chunk_size, self.overlap)
-            
-            for parent_text in parents:
-                parent_id = str(uuid.uuid4())
-                parent_chunks[parent_id] = {
-                    'text': parent_text,
-                    'filename': filename
-                }
-                
-                children = self.create_chunks(parent_text, self.child_chunk_size, self.overlap // 2)
-                
-                for child_text in children:
-                    child_id = str(uuid.uuid4())
-                    child_chunks.append({
-                        'id': child_id,
-                        'text': child_text,
-                        'parent_id': parent_id,
-                        'filename': filename
-                    })
-                    child_to_parent_map[child_id] = parent_id
+        for record in self.iter_hierarchical_chunks(documents):
+            parent_chunks[record['parent_id']] = {
+                'text': record['text'],
+                'filename': record['filename']
+            }
+            for child in record['child_chunks']:
+                child_chunks.append(child)
+                child_to_parent_map[child['id']] = record['parent_id']
         
         return {
             'parent_chunks': parent_chunks,
@@ -58,22 +255,260 @@ class HierarchicalChunker:
             'child_to_parent_map': child_to_parent_map
         }
 
+    def iter_hierarchical_chunks(self, documents: Iterable[Dict]) -> Iterator[Dict]:
+        for doc in documents:
+            filename = doc['filename']
+            seen_children = set()
+            record = None
+            
+            for chunk in self.iter_chunks_for_document(doc['content'], filename):
+                if record is None or record['parent_id'] != chunk['parent_id']:
+                    if record is not None:
+                        yield record
+                    record = {
+                        'parent_id': chunk['parent_id'],
+                        'text': chunk['parent_text'],
+                        'filename': filename,
+                        'child_chunks': []
+                    }
+                
+                child_id = f"{filename}_{chunk['chunk_id']}"
+                if child_id in seen_children:
+                    continue
+                seen_children.add(child_id)
+                record['child_chunks'].append({
+                    'id': child_id,
+                    'text': chunk['child_text'],
+                    'parent_id': chunk['parent_id'],
+                    'filename': filename
+                })
+            
+            if record is not None:
+                yield record
+
     def create_chunks_for_document(self, content: str, filename: str) -> List[Dict]:
-        chunks = []
-        parents = self.create_chunks(content, self.parent_chunk_size, self.overlap)
+        return list(self.iter_chunks_for_document(content, filename))
+
+    def iter_chunks_for_document(self, content: str, filename: str) -> Iterator[Dict]:
+        if self.token_counter is not None:
+            chunk_set = ChunkSet(content, filename, counts_tokens=True)
+            for parent_index, first in self._iter_token_parents(chunk_set):
+                yield from chunk_set.iter_parent(parent_index, first)
+            return
         
-        for i, parent_text in enumerate(parents):
-            parent_id = f"{filename}_parent_{i}"
+        # the set only grows by a few offsets per chunk; records are sliced
+        # out of the shared buffer as each parent is yielded
+        chunk_set = ChunkSet(content, filename)
+        for parent_start, parent_end in self.iter_chunk_spans(content, self.parent_chunk_size, self.overlap):
+            first = len(chunk_set)
+            yield from chunk_set.iter_parent(self._add_parent(chunk_set, parent_start, parent_end), first)
+
+    def iter_chunks_from_pages(self, pages: Iterable[Tuple[int, str]], filename: str) -> Iterator[Dict]:
+        if self.token_counter is not None:
+            yield from self.iter_token_chunks_from_pages(pages, filename)
+            return
+        if self.boundary_mode == 'content':
+            yield from self.iter_content_chunks_from_pages(pages, filename)
+            return
+        
+        buffer = ""
+        cursor = 0
+        page_offsets: List[int] = []
+        page_numbers: List[int] = []
+        step = self.parent_chunk_size - self.overlap
+        
+        for page_number, page_text in pages:
+            if cursor > len(buffer) // 2:
+                buffer = buffer[cursor:]
+                page_offsets, page_numbers = self._shift_pages(page_offsets, page_numbers, cursor)
+                cursor = 0
+            page_offsets.append(len(buffer))
+            page_numbers.append(page_number)
+            buffer += page_text
             
-            children = self.create_chunks(parent_text, self.child_chunk_size, self.overlap // 2)
+            while len(buffer) - cursor >= self.parent_chunk_size:
+                end = cursor + self.parent_chunk_size
+                if NON_SPACE.search(buffer, cursor, end):
+                    yield from self._chunks_for_parent(buffer[cursor:end], filename, page_offsets, page_numbers, cursor)
+                cursor += step
+        
+        for start, end in self.create_chunk_spans(buffer, self.parent_chunk_size, self.overlap, cursor):
+            yield from self._chunks_for_parent(buffer[start:end], filename, page_offsets, page_numbers, start)
+    
+    def iter_content_chunks_from_pages(self, pages: Iterable[Tuple[int, str]], filename: str) -> Iterator[Dict]:
+        buffer = ""
+        cursor = 0
+        page_offsets: List[int] = []
+        page_numbers: List[int] = []
+        max_size = self.parent_chunk_size - self.overlap
+        
+        for page_number, page_text in pages:
+            base = cursor - self.overlap
+            if base > len(buffer) // 2:
+                buffer = buffer[base:]
+                page_offsets, page_numbers = self._shift_pages(page_offsets, page_numbers, base)
+                cursor -= base
+            page_offsets.append(len(buffer))
+            page_numbers.append(page_number)
+            buffer += page_text
             
-            for j, child_text in enumerate(children):
-                chunk_id = f"parent_{i}_child_{j}"
-                chunks.append({
-                    'chunk_id': chunk_id,
-                    'parent_id': parent_id,
-                    'child_text': child_text,
-                    'parent_text': parent_text
-                })
+            while len(buffer) - cursor > max_size:
+                end = self._next_boundary(buffer, cursor, len(buffer), max_size)
+                start = max(cursor - self.overlap, 0)
+                if NON_SPACE.search(buffer, start, end):
+                    yield from self._chunks_for_parent(buffer[start:end], filename, page_offsets, page_numbers, start)
+                cursor = end
+        
+        for start, end in self.create_content_spans(buffer, self.parent_chunk_size, self.overlap, cursor, floor=0):
+            yield from self._chunks_for_parent(buffer[start:end], filename, page_offsets, page_numbers, start)
+    
+    def iter_token_chunks_from_pages(self, pages: Iterable[Tuple[int, str]], filename: str) -> Iterator[Dict]:
+        buffer = ""
+        token_starts = array('q')
+        token_ends = array('q')
+        cursor = 0
+        page_offsets: List[int] = []
+        page_numbers: List[int] = []
+        step = self.parent_chunk_size - self.overlap
+        
+        for batch in self._batched(pages):
+            page_tokens = self.token_counter.offsets_batch([page_text for _, page_text in batch])
+            for (page_number, page_text), offsets in zip(batch, page_tokens):
+                if cursor > len(token_starts) // 2:
+                    base = token_starts[cursor] if cursor < len(token_starts) else len(buffer)
+                    buffer = buffer[base:]
+                    token_starts = array('q', (start - base for start in token_starts[cursor:]))
+                    token_ends = array('q', (end - base for end in token_ends[cursor:]))
+                    page_offsets, page_numbers = self._shift_pages(page_offsets, page_numbers, base)
+                    cursor = 0
+                page_offsets.append(len(buffer))
+                page_numbers.append(page_number)
+                token_starts.extend(len(buffer) + start for start, _ in offsets)
+                token_ends.extend(len(buffer) + end for _, end in offsets)
+                buffer += page_text
+                
+                while len(token_starts) - cursor >= self.parent_chunk_size:
+                    last = cursor + self.parent_chunk_size
+                    if NON_SPACE.search(buffer, token_starts[cursor], token_ends[last - 1]):
+                        yield from self._token_chunks_for_parent(buffer, token_starts, token_ends, cursor, last,
+                                                                 filename, page_offsets, page_numbers)
+                    cursor += step
+        
+        for first, last in self.create_token_spans(buffer, token_starts, token_ends, self.parent_chunk_size,
+                                                   self.overlap, cursor):
+            yield from self._token_chunks_for_parent(buffer, token_starts, token_ends, first, last,
+                                                     filename, page_offsets, page_numbers)
+    
+    def iter_chunks_from_rows(self, rows: Iterable[Tuple[int, str]], filename: str) -> Iterator[Dict]:
+        parent_rows: List[Tuple[int, str, int]] = []
+        parent_length = 0
+        
+        for row_number, record, length in self._measured_rows(rows):
+            if parent_rows and parent_length + length > self.parent_chunk_size:
+                yield from self._chunks_for_row_parent(parent_rows, filename)
+                parent_rows = []
+                parent_length = 0
+            parent_rows.append((row_number, record, length))
+            parent_length += length
+        
+        if parent_rows:
+            yield from self._chunks_for_row_parent(parent_rows, filename)
+    
+    def iter_document_chunks(self, doc: Dict) -> Iterator[Dict]:
+        if doc.get('unit') == 'row':
+            chunks = self.iter_chunks_from_rows(doc['pages'], doc['filename'])
+        else:
+            chunks = self.iter_chunks_from_pages(doc['pages'], doc['filename'])
+        
+        for chunk in chunks:
+            chunk['unit'] = doc.get('unit', 'page')
+            yield chunk
+    
+    def _chunks_for_parent(self, parent_text: str, filename: str, page_offsets: List[int], page_numbers: List[int],
+                           base: int = 0) -> Iterator[Dict]:
+        parent_id = parent_id_for(filename, parent_text)
+        
+        for start, end in self.create_chunk_spans(parent_text, self.child_chunk_size, self.overlap // 2):
+            child_text = parent_text[start:end]
+            yield {
+                'chunk_id': chunk_id_for(parent_id, child_text),
+                'parent_id': parent_id,
+                'child_text': child_text,
+                'parent_text': parent_text,
+                'page': self._page_at(page_offsets, page_numbers, base + start)
+            }
+    
+    def _token_chunks_for_parent(self, buffer: str, token_starts: array, token_ends: array, first: int, last: int,
+                                 filename: str, page_offsets: List[int], page_numbers: List[int]) -> Iterator[Dict]:
+        parent_text = buffer[token_starts[first]:token_ends[last - 1]]
+        parent_id = parent_id_for(filename, parent_text)
+        
+        for child_first, child_last in self.create_token_spans(buffer, token_starts, token_ends, self.child_chunk_size,
+                                                               self.overlap // 2, first, last):
+            start = token_starts[child_first]
+            child_text = buffer[start:token_ends[child_last - 1]]
+            yield {
+                'chunk_id': chunk_id_for(parent_id, child_text),
+                'parent_id': parent_id,
+                'child_text': child_text,
+                'parent_text': parent_text,
+                'page': self._page_at(page_offsets, page_numbers, start),
+                'token_count': child_last - child_first,
+                'parent_token_count': last - first
+            }
+    
+    def _chunks_for_row_parent(self, rows: List[Tuple[int, str, int]], filename: str) -> Iterator[Dict]:
+        parent_text = "".join(record for _, record, _ in rows)
+        parent_id = parent_id_for(filename, parent_text)
+        parent_length = sum(length for _, _, length in rows)
+        child_groups: List[List[Tuple[int, str, int]]] = []
+        child_length = 0
+        
+        for row_number, record, length in rows:
+            if not child_groups or child_length + length > self.child_chunk_size:
+                child_groups.append([])
+                child_length = 0
+            child_groups[-1].append((row_number, record, length))
+            child_length += length
         
-        return chunks
+        for child_rows in child_groups:
+            child_text = "".join(record for _, record, _ in child_rows)
+            chunk = {
+                'chunk_id': chunk_id_for(parent_id, child_text),
+                'parent_id': parent_id,
+                'child_text': child_text,
+                'parent_text': parent_text,
+                'page': child_rows[0][0]
+            }
+            if self.token_counter is not None:
+                chunk['token_count'] = sum(length for _, _, length in child_rows)
+                chunk['parent_token_count'] = parent_length
+            yield chunk
+    
+    def _measured_rows(self, rows: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str, int]]:
+        if self.token_counter is None:
+            for row_number, record in rows:
+                yield row_number, record, len(record)
+            return
+        
+        for batch in self._batched(rows):
+            counts = self.token_counter.count_batch([record for _, record in batch])
+            for (row_number, record), count in zip(batch, counts):
+                yield row_number, record, count
+    
+    def _batched(self, items: Iterable) -> Iterator[List]:
+        iterator = iter(items)
+        while True:
+            batch = list(islice(iterator, self.token_counter.batch_size))
+            if not batch:
+                return
+            yield batch
+    
+    def _page_at(self, page_offsets: List[int], page_numbers: List[int], offset: int) -> int:
+        index = bisect_right(page_offsets, offset) - 1
+        return page_numbers[max(index, 0)] if page_numbers else 1
+    
+    def _shift_pages(self, page_offsets: List[int], page_numbers: List[int], step: int) -> Tuple[List[int], List[int]]:
+        first = max(bisect_right(page_offsets, step) - 1, 0)
+        shifted_offsets = [max(offset - step, 0) for offset in page_offsets[first:]]
+        return shifted_offsets, page_numbers[first:]
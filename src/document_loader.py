@@ -1,28 +1,145 @@
+import io
 import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Tuple
+from datetime import date, datetime
 import pandas as pd
+from openpyxl import load_workbook
 from pypdf import PdfReader
 from docx import Document
+from src.parse_cache import ParsedTextCache
 
 
 class DocumentLoader:
-    def __init__(self, documents_path: str):
+    def __init__(self, documents_path: str, max_workers: int = 1, tabular_rows: bool = True,
+                 tabular_chunksize: int = 10000, cache: Optional[ParsedTextCache] = None, recursive: bool = True,
+                 pdf_split_threshold: int = 20 * 1024 * 1024, pdf_workers: Optional[int] = None,
+                 pdf_range_pages: int = 50):
         self.documents_path = Path(documents_path)
+        self.max_workers = max_workers
+        self.recursive = recursive
+        self.cache = cache
+        self.tabular_rows = tabular_rows
+        self.tabular_chunksize = tabular_chunksize
+        self.pdf_split_threshold = pdf_split_threshold
+        self.pdf_workers = pdf_workers or os.cpu_count() or 1
+        self.pdf_range_pages = pdf_range_pages
+        self.errors: List[Dict] = []
+        self.archive_extensions = {'.zip'}
     
-    def load_pdf(self, file_path: Path) -> str:
+    def iter_pdf_pages(self, file_path: Path) -> Iterator[Tuple[int, str]]:
+        if self.should_split_pdf(file_path):
+            yield from self.iter_pdf_pages_parallel(file_path)
+            return
+        if hasattr(file_path, 'read'):
+            # zip members report mode 'r', which pypdf warns about; pypdf reads
+            # paths into memory the same way
+            file_path = io.BytesIO(file_path.read())
         reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        for page_number, page in enumerate(reader.pages, start=1):
+            yield page_number, page.extract_text() + "\n"
     
-    def load_docx(self, file_path: Path) -> str:
+    def should_split_pdf(self, file_path) -> bool:
+        if self.pdf_workers <= 1 or not isinstance(file_path, Path):
+            return False
+        return file_path.stat().st_size >= self.pdf_split_threshold
+    
+    def extract_pdf_range(self, file_path: Path, start: int, end: int) -> List[Tuple[int, str]]:
+        reader = PdfReader(file_path)
+        return [(index + 1, reader.pages[index].extract_text() + "\n") for index in range(start, end)]
+    
+    def iter_pdf_pages_parallel(self, file_path: Path) -> Iterator[Tuple[int, str]]:
+        page_count = len(PdfReader(file_path).pages)
+        ranges = [(start, min(start + self.pdf_range_pages, page_count))
+                  for start in range(0, page_count, self.pdf_range_pages)]
+        if len(ranges) <= 1:
+            yield from self.extract_pdf_range(file_path, 0, page_count)
+            return
+        
+        with ProcessPoolExecutor(max_workers=min(self.pdf_workers, len(ranges))) as executor:
+            futures = [executor.submit(self.extract_pdf_range, file_path, start, end) for start, end in ranges]
+            for future in futures:
+                yield from future.result()
+    
+    def iter_docx_paragraphs(self, file_path: Path) -> Iterator[Tuple[int, str]]:
         doc = Document(file_path)
-        text = ""
-        for para in doc.paragraphs:
-            text += para.text + "\n"
-        return text
+        for paragraph_number, para in enumerate(doc.paragraphs, start=1):
+            yield paragraph_number, para.text + "\n"
+    
+    def format_row(self, columns: List[str], values) -> str:
+        fields = []
+        for column, value in zip(columns, values):
+            value = self._format_cell(value)
+            if value:
+                fields.append(f"{self._escape_column(column)}={self._escape_field(value)}")
+        return "; ".join(fields) + "\n" if fields else ""
+    
+    def _escape_field(self, text: str) -> str:
+        # records are one line of "column=value; " fields, so a cell cannot
+        # carry a line break or a bare separator
+        if '\n' in text or '\r' in text:
+            text = " ".join(text.splitlines())
+        return text.replace('\\', '\\\\').replace('; ', '\\; ')
+    
+    def _escape_column(self, column: str) -> str:
+        return self._escape_field(column).replace('=', '\\=')
+    
+    def _format_cell(self, value) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        if isinstance(value, datetime):
+            return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat()
+        if isinstance(value, date):
+            return value.isoformat()
+        return str(value).strip()
+    
+    def iter_csv_rows(self, file_path: Path) -> Iterator[Tuple[int, str]]:
+        row_number = 1
+        for frame in pd.read_csv(file_path, dtype=str, keep_default_na=False, chunksize=self.tabular_chunksize):
+            columns = [str(column).strip() for column in frame.columns]
+            for values in frame.itertuples(index=False, name=None):
+                row_number += 1
+                record = self.format_row(columns, values)
+                if record:
+                    yield row_number, record
+    
+    def iter_xlsx_rows(self, file_path: Path) -> Iterator[Tuple[int, str]]:
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            multiple_sheets = len(workbook.worksheets) > 1
+            for sheet in workbook.worksheets:
+                yield from self._iter_sheet_rows(sheet.title, sheet.iter_rows(values_only=True), multiple_sheets)
+        finally:
+            workbook.close()
+    
+    def iter_xls_rows(self, file_path: Path) -> Iterator[Tuple[int, str]]:
+        sheets = pd.read_excel(file_path, sheet_name=None, header=None, dtype=object)
+        for title, frame in sheets.items():
+            rows = ([None if pd.isna(value) else value for value in values]
+                    for values in frame.itertuples(index=False, name=None))
+            yield from self._iter_sheet_rows(title, rows, len(sheets) > 1)
+    
+    def _iter_sheet_rows(self, title: str, rows, multiple_sheets: bool) -> Iterator[Tuple[int, str]]:
+        columns = None
+        for row_number, values in enumerate(rows, start=1):
+            if columns is None:
+                if any(self._format_cell(value) for value in values):
+                    columns = [self._format_cell(value) or f"column_{i + 1}" for i, value in enumerate(values)]
+                continue
+            record = self.format_row(columns, values)
+            if record:
+                yield row_number, f"sheet={self._escape_field(title)}; {record}" if multiple_sheets else record
+    
+    def load_pdf(self, file_path: Path) -> str:
+        return "".join(text for _, text in self.iter_pdf_pages(file_path))
+    
+    def load_docx(self, file_path: Path) -> str:
+        return "".join(text for _, text in self.iter_docx_paragraphs(file_path))
     
     def load_excel(self, file_path: Path) -> str:
         df = pd.read_excel(file_path)
@@ -33,12 +150,13 @@ class DocumentLoader:
         return df.to_string()
     
     def load_txt(self, file_path: Path) -> str:
+        if hasattr(file_path, 'read'):
+            return io.TextIOWrapper(file_path, encoding='utf-8').read()
         with open(file_path, 'r', encoding='utf-8') as f:
             return f.read()
     
-    def load_all_documents(self) -> List[Dict]:
-        documents = []
-        supported_extensions = {
+    def get_loaders(self) -> Dict:
+        return {
             '.pdf': self.load_pdf,
             '.docx': self.load_docx,
             '.doc': self.load_docx,
@@ -47,19 +165,177 @@ class DocumentLoader:
             '.csv': self.load_csv,
             '.txt': self.load_txt
         }
+    
+    def get_page_readers(self) -> Dict:
+        page_readers = {
+            '.pdf': self.iter_pdf_pages,
+            '.docx': self.iter_docx_paragraphs,
+            '.doc': self.iter_docx_paragraphs
+        }
+        if self.tabular_rows:
+            page_readers.update({
+                '.csv': self.iter_csv_rows,
+                '.xlsx': self.iter_xlsx_rows,
+                '.xls': self.iter_xls_rows
+            })
+        return page_readers
+    
+    def get_unit(self, ext: str) -> str:
+        if ext in ('.docx', '.doc'):
+            return 'paragraph'
+        if self.tabular_rows and ext in ('.csv', '.xlsx', '.xls'):
+            return 'row'
+        return 'page'
+    
+    def iter_pages(self, file_path, ext: Optional[str] = None) -> Iterator[Tuple[int, str]]:
+        ext = ext or Path(file_path).suffix.lower()
+        page_readers = self.get_page_readers()
+        if ext in page_readers:
+            yield from page_readers[ext](file_path)
+        else:
+            yield 1, self.get_loaders()[ext](file_path)
+    
+    def list_files(self) -> List[Path]:
+        supported_extensions = set(self.get_loaders()) | self.archive_extensions
+        candidates = self.documents_path.rglob('*') if self.recursive else self.documents_path.iterdir()
+        return sorted(
+            file_path for file_path in candidates
+            if file_path.is_file() and file_path.suffix.lower() in supported_extensions
+        )
+    
+    def relative_name(self, file_path: Path) -> str:
+        return file_path.relative_to(self.documents_path).as_posix()
+    
+    def list_archive_members(self, archive: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+        supported_extensions = self.get_loaders()
+        return [
+            member for member in archive.infolist()
+            if not member.is_dir() and Path(member.filename).suffix.lower() in supported_extensions
+        ]
+    
+    def list_units(self, files: List[Path]) -> List[Tuple[Path, Optional[str]]]:
+        units = []
+        for file_path in files:
+            if file_path.suffix.lower() in self.archive_extensions:
+                try:
+                    with zipfile.ZipFile(file_path) as archive:
+                        units.extend((file_path, member.filename) for member in self.list_archive_members(archive))
+                except Exception as e:
+                    self.errors.append(self._error(file_path, None, e))
+            else:
+                units.append((file_path, None))
+        return units
+    
+    def _document(self, file_path: Path, member: Optional[str], **fields) -> Dict:
+        source = self.relative_name(file_path)
+        ext = Path(member or file_path).suffix.lower()
+        return {
+            'filename': f"{source}/{member}" if member else source,
+            'source': source,
+            'extension': ext,
+            'unit': self.get_unit(ext),
+            **fields
+        }
+    
+    def _error(self, file_path: Path, member: Optional[str], error: Exception) -> Dict:
+        return self._document(file_path, member, error=str(error))
+    
+    def load_file(self, file_path: Path, member: Optional[str] = None) -> Dict:
+        if member is None:
+            ext = file_path.suffix.lower()
+            return self._document(file_path, None, content=self.get_loaders()[ext](file_path))
+        with zipfile.ZipFile(file_path) as archive, archive.open(member) as stream:
+            ext = Path(member).suffix.lower()
+            return self._document(file_path, member, content=self.get_loaders()[ext](stream))
+    
+    def load_file_pages(self, file_path: Path, member: Optional[str] = None) -> Dict:
+        if member is None:
+            return self._document(file_path, None, pages=list(self._read_pages(file_path, None, file_path)),
+                                  bytes=file_path.stat().st_size)
+        with zipfile.ZipFile(file_path) as archive, archive.open(member) as stream:
+            return self._document(file_path, member, pages=list(self._read_pages(file_path, member, stream)),
+                                  bytes=archive.getinfo(member).file_size)
+    
+    def open_file_pages(self, file_path: Path) -> Iterator[Dict]:
+        if file_path.suffix.lower() not in self.archive_extensions:
+            yield self._document(file_path, None, pages=self._guarded_pages(file_path, None, file_path),
+                                 bytes=file_path.stat().st_size)
+            return
         
-        for file_path in self.documents_path.iterdir():
-            if file_path.is_file():
-                ext = file_path.suffix.lower()
-                if ext in supported_extensions:
+        with zipfile.ZipFile(file_path) as archive:
+            for member in self.list_archive_members(archive):
+                with archive.open(member) as stream:
+                    yield self._document(file_path, member.filename, pages=self._guarded_pages(file_path, member.filename, stream),
+                                         bytes=member.file_size)
+    
+    def _read_pages(self, file_path: Path, member: Optional[str], stream) -> Iterator[Tuple[int, str]]:
+        pages = self.iter_pages(stream, Path(member or file_path).suffix.lower())
+        if self.cache is None:
+            return pages
+        variant = 'rows-escaped-2' if self.tabular_rows else 'text'
+        return self.cache.cached_pages(self.cache.entry_for(file_path, member, variant), pages)
+    
+    def _guarded_pages(self, file_path: Path, member: Optional[str], stream) -> Iterator[Tuple[int, str]]:
+        try:
+            yield from self._read_pages(file_path, member, stream)
+        except Exception as e:
+            self.errors.append(self._error(file_path, member, e))
+    
+    def _iter_opened(self, files: List[Path]) -> Iterator[Dict]:
+        self.errors = []
+        for file_path in files:
+            try:
+                yield from self.open_file_pages(file_path)
+            except Exception as e:
+                self.errors.append(self._error(file_path, None, e))
+    
+    def _run_loader(self, load_fn, files: Optional[List[Path]], max_workers: Optional[int]) -> Iterator[Dict]:
+        workers = max_workers or self.max_workers
+        files = self.list_files() if files is None else files
+        self.errors = []
+        units = self.list_units(files)
+        
+        if workers <= 1 or len(units) <= 1:
+            for file_path, member in units:
+                try:
+                    yield load_fn(file_path, member)
+                except Exception as e:
+                    self.errors.append(self._error(file_path, member, e))
+            return
+        
+        # at most `workers` units are loaded ahead of the consumer, so loaded
+        # documents never pile up with corpus size
+        workers = min(workers, len(units))
+        units = iter(units)
+        pending = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while True:
+                for file_path, member in islice(units, workers - len(pending)):
+                    pending[executor.submit(load_fn, file_path, member)] = (file_path, member)
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                while done:
+                    future = done.pop()
+                    unit = pending.pop(future)
                     try:
-                        content = supported_extensions[ext](file_path)
-                        documents.append({
-                            'filename': file_path.name,
-                            'content': content,
-                            'extension': ext
-                        })
+                        document = future.result()
                     except Exception as e:
-                        print(f"Error loading {file_path}: {e}")
-        
-        return documents
+                        self.errors.append(self._error(*unit, e))
+                        continue
+                    del future
+                    yield document
+                    del document
+    
+    def iter_documents(self, max_workers: Optional[int] = None) -> Iterator[Dict]:
+        return self._run_loader(self.load_file, None, max_workers)
+    
+    def iter_page_documents(self, files: Optional[List[Path]] = None, max_workers: Optional[int] = None) -> Iterator[Dict]:
+        workers = max_workers or self.max_workers
+        files = self.list_files() if files is None else files
+        if workers <= 1:
+            return self._iter_opened(files)
+        return self._run_loader(self.load_file_pages, files, workers)
+    
+    def load_all_documents(self, max_workers: Optional[int] = None) -> List[Dict]:
+        return list(self.iter_documents(max_workers))
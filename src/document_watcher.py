@@ -0,0 +1,90 @@
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class DocumentWatcher:
+    def __init__(self, pipeline, poll_interval: float = 2.0, debounce_seconds: float = 5.0,
+                 max_batch_delay: float = 60.0):
+        self.pipeline = pipeline
+        self.poll_interval = poll_interval
+        self.debounce_seconds = debounce_seconds
+        self.max_batch_delay = max_batch_delay
+        self.last_result: Optional[Dict] = None
+        self.last_error: Optional[str] = None
+        self._snapshot: Dict[str, Tuple[int, float]] = {}
+        self._pending: Set[str] = set()
+        self._first_change = 0.0
+        self._last_change = 0.0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def snapshot(self) -> Dict[str, Tuple[int, float]]:
+        loader = self.pipeline.document_loader
+        snapshot = {}
+        for file_path in loader.list_files():
+            try:
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[loader.relative_name(file_path)] = (stat.st_size, stat.st_mtime)
+        return snapshot
+    
+    def detect_changes(self) -> List[str]:
+        current = self.snapshot()
+        changed = [name for name, signature in current.items() if self._snapshot.get(name) != signature]
+        changed.extend(name for name in self._snapshot if name not in current)
+        self._snapshot = current
+        return changed
+    
+    def poll(self) -> Optional[Dict]:
+        now = time.monotonic()
+        changed = self.detect_changes()
+        
+        if changed:
+            if not self._pending:
+                self._first_change = now
+            self._pending.update(changed)
+            self._last_change = now
+        
+        if not self._pending:
+            return None
+        
+        quiet = now - self._last_change >= self.debounce_seconds
+        overdue = now - self._first_change >= self.max_batch_delay
+        if not (quiet or overdue):
+            return None
+        
+        names = sorted(self._pending)
+        self._pending.clear()
+        try:
+            self.last_result = self.pipeline.sync_files(names)
+        except Exception:
+            self._pending.update(names)
+            raise
+        return self.last_result
+    
+    def start(self):
+        if self.is_running():
+            return
+        self._snapshot = self.snapshot()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="document-watcher", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def _run(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.poll()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
@@ -1,87 +1,161 @@
-from typing import Dict, List
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
 from src.document_loader import DocumentLoader
 from src.chunking import HierarchicalChunker
 from src.empirical_vector_store import EmpiricalVectorStore
 from src.entity_extractor import EntityExtractor
 from src.complexity import ComplexityAnalyzer
 from src.llm_handler import LLMHandler
+from src.manifest import DocumentManifest
+from src.parse_cache import ParsedTextCache
+from src.ingestion import StagedIngestor
+from src.token_counter import TokenCounter
 
 
 class EmpiricalRAGPipeline:
-    def __init__(self, documents_path: str):
+    def __init__(self, documents_path: str, load_workers: int = 1, parse_cache_dir: str = "./parsed_text_cache",
+                 memory_budget_bytes: int = 256 * 1024 * 1024, stage_workers: Optional[Dict[str, int]] = None,
+                 chunk_unit: str = "chars", tokenizer_model: str = "slm", boundary_mode: str = "fixed",
+                 near_duplicate_distance: Optional[int] = 3, extraction_workers: Optional[int] = None):
         self.documents_path = documents_path
-        self.document_loader = DocumentLoader(documents_path)
-        self.chunker = HierarchicalChunker()
-        self.vector_store = EmpiricalVectorStore()
-        self.entity_extractor = EntityExtractor()
+        self.document_loader = DocumentLoader(
+            documents_path,
+            max_workers=load_workers,
+            cache=ParsedTextCache(parse_cache_dir)
+        )
+        if chunk_unit == "tokens":
+            self.chunker = HierarchicalChunker.for_tokens(TokenCounter.for_model(tokenizer_model), boundary_mode=boundary_mode)
+        else:
+            self.chunker = HierarchicalChunker(boundary_mode=boundary_mode)
+        self.tokenizer_model = tokenizer_model
+        self._token_counters: Dict[str, TokenCounter] = {}
+        self.vector_store = EmpiricalVectorStore(near_duplicate_distance=near_duplicate_distance)
+        self.manifest = DocumentManifest(os.path.join(self.vector_store.persist_dir, "manifest.json"))
+        self.entity_extractor = EntityExtractor(workers=extraction_workers)
         self.complexity_analyzer = ComplexityAnalyzer()
         self.llm_handler = LLMHandler()
+        self.ingestor = StagedIngestor(
+            self.document_loader,
+            self.chunker,
+            self.entity_extractor,
+            self.vector_store,
+            memory_budget_bytes=memory_budget_bytes,
+            stage_workers=stage_workers,
+            log_path=os.path.join(self.vector_store.persist_dir, "ingestion_log.jsonl")
+        )
         self.is_initialized = False
         self.indexing_stats = {}
+        self._index_lock = threading.RLock()
     
-    def initialize(self) -> Dict:
-        documents = self.document_loader.load_all_documents()
-        
-        if not documents:
+    def initialize(self, force: bool = False) -> Dict:
+        with self._index_lock:
+            files = {self.document_loader.relative_name(f): f for f in self.document_loader.list_files()}
+            
+            if (force or not self.manifest.entries or self.vector_store.chunks_collection.count() == 0
+                    or self.vector_store.requires_rebuild):
+                self.vector_store.clear_all()
+                self.manifest.clear()
+            
+            changed, removed = self.manifest.diff(files)
+            stats = self._apply_changes(files, changed, removed)
+            
+            if not files:
+                return {
+                    'success': False,
+                    'message': 'No documents found in the documents folder',
+                    'document_count': 0,
+                    'load_errors': self.document_loader.errors
+                }
+            
+            self.is_initialized = True
+            
+            self.indexing_stats = {
+                'document_count': len(files),
+                'documents_unchanged': len(files) - len(changed),
+                **stats
+            }
+            
             return {
-                'success': False,
-                'message': 'No documents found in the documents folder',
-                'document_count': 0
+                'success': True,
+                'message': 'Documents loaded with Empirical Data Modelling',
+                **self.indexing_stats,
+                'load_errors': self.document_loader.errors
             }
-        
-        self.vector_store.clear_all()
-        
-        total_entities = 0
-        total_facts = 0
-        total_chunks = 0
-        entities_by_type = {}
-        
-        for doc in documents:
-            filename = doc['filename']
-            content = doc['content']
+    
+    def sync_files(self, names: List[str]) -> Dict:
+        with self._index_lock:
+            files = {}
+            for name in names:
+                file_path = self.document_loader.documents_path / name
+                if file_path.is_file():
+                    files[name] = file_path
             
-            chunks = self.chunker.create_chunks_for_document(content, filename)
-            total_chunks += len(chunks)
+            changed = self.manifest.find_changed(files)
+            removed = [name for name in names if name not in files and name in self.manifest.entries]
+            stats = self._apply_changes(files, changed, removed)
             
-            for chunk in chunks:
-                chunk_id = f"{filename}_{chunk['chunk_id']}"
-                
-                self.vector_store.add_chunks([chunk], filename)
-                
-                entities = self.entity_extractor.extract_entities(chunk['parent_text'])
-                total_entities += len(entities)
-                
-                for entity in entities:
-                    entities_by_type[entity.entity_type] = entities_by_type.get(entity.entity_type, 0) + 1
-                
-                self.vector_store.add_entities(entities, chunk_id, filename, chunk['child_text'])
-                
-                facts = self.entity_extractor.extract_facts(chunk['parent_text'], entities)
-                total_facts += len(facts)
-                
-                self.vector_store.add_facts(facts, chunk_id, filename)
-        
-        self.is_initialized = True
+            return {
+                'success': True,
+                'message': 'Document changes applied',
+                **stats,
+                'load_errors': self.document_loader.errors
+            }
+    
+    def _apply_changes(self, files: Dict, changed: Dict[str, Dict], removed: List[str]) -> Dict:
+        cache = self.document_loader.cache
+        orphaned = set()
+        for name in removed:
+            orphaned |= self.vector_store.delete_source(name)
+            self.manifest.remove(name)
+            if cache is not None:
+                cache.remove(self.document_loader.documents_path / name)
+        if cache is not None:
+            for fingerprint in changed.values():
+                cache.remember(fingerprint)
         
-        self.indexing_stats = {
-            'document_count': len(documents),
-            'total_chunks': total_chunks,
-            'total_entities': total_entities,
-            'total_facts': total_facts,
-            'entities_by_type': entities_by_type
+        stats = {
+            'documents_indexed': 0,
+            'documents_removed': len(removed),
+            'documents_reindexed': 0,
+            **self.ingestor.run([files[name] for name in changed])
         }
+        orphaned |= self._prune_sources(changed)
+        failed = {error['source'] for error in self.document_loader.errors}
         
-        return {
-            'success': True,
-            'message': 'Documents loaded with Empirical Data Modelling',
-            'document_count': len(documents),
-            'total_chunks': total_chunks,
-            'total_entities': total_entities,
-            'total_facts': total_facts,
-            'entities_by_type': entities_by_type
-        }
+        # orphaned sources are usually outside this batch (the watcher only
+        # passes the files that changed), so look them up on disk
+        documents_path = self.document_loader.documents_path
+        orphaned = {name for name in orphaned if name not in failed and (documents_path / name).is_file()}
+        if orphaned:
+            if cache is not None:
+                for name in orphaned:
+                    cache.remember(changed.get(name) or self.manifest.entries.get(name, {}))
+            rerun = self.ingestor.run([documents_path / name for name in sorted(orphaned)])
+            self._prune_sources(orphaned)
+            failed |= {error['source'] for error in self.document_loader.errors}
+            stats['documents_reindexed'] = len(orphaned)
+            for key in ['total_chunks', 'chunks_reused', 'near_duplicates', 'total_entities', 'entities_embedded',
+                        'total_facts']:
+                stats[key] += rerun[key]
+        
+        for name, fingerprint in changed.items():
+            if name not in failed:
+                self.manifest.update(name, fingerprint)
+                stats['documents_indexed'] += 1
+        
+        self.vector_store.save()
+        self.manifest.save()
+        return stats
     
-    def query(self, question: str) -> Dict:
+    def _prune_sources(self, names) -> set:
+        orphaned = set()
+        for name in names:
+            keep_chunk_ids = self.ingestor.chunk_ids_by_source.get(name, set())
+            orphaned |= self.vector_store.delete_source(name, keep_chunk_ids=keep_chunk_ids)
+        return orphaned
+    
+    def query(self, question: str, ranges: Optional[Dict[str, Tuple]] = None) -> Dict:
         if not self.is_initialized:
             init_result = self.initialize()
             if not init_result['success']:
@@ -96,7 +170,7 @@ class EmpiricalRAGPipeline:
         
         model_type, complexity_score, complexity_reason = self.complexity_analyzer.analyze(question)
         
-        hybrid_results = self.vector_store.hybrid_search(question, top_k=5)
+        hybrid_results = self.vector_store.hybrid_search(question, top_k=5, ranges=ranges)
         
         chunk_results = hybrid_results['chunks']
         entity_results = hybrid_results['entities']
@@ -123,7 +197,11 @@ class EmpiricalRAGPipeline:
         
         context_parts = []
         
+        seen_parents = set()
         for chunk in filtered_chunks:
+            if chunk['parent_id'] in seen_parents:
+                continue
+            seen_parents.add(chunk['parent_id'])
             context_parts.append(chunk['parent_text'])
         
         if fact_results:
@@ -134,14 +212,18 @@ class EmpiricalRAGPipeline:
             if len(fact_context) > 20:
                 context_parts.append(fact_context)
         
+        use_llm = model_type == "LLM"
+        token_counter = self.chunker.token_counter
+        if token_counter is not None:
+            context_parts = self._fit_context(question, filtered_chunks, context_parts[len(seen_parents):], use_llm)
+        
         context = "\n\n---\n\n".join(context_parts)
         
         avg_relevance = sum([r['relevance_score'] for r in filtered_chunks]) / len(filtered_chunks)
         
-        use_llm = model_type == "LLM"
-        response = self.llm_handler.generate(question, context, use_llm)
+        response = self.llm_handler.generate(question, context, use_llm, truncate_context=token_counter is None)
         
-        sources = [{'filename': r['filename'], 'relevance': round(r['relevance_score'], 3)} for r in filtered_chunks]
+        sources = [{'filename': r['filename'], 'unit': r['unit'], 'page': r['page'], 'relevance': round(r['relevance_score'], 3)} for r in filtered_chunks]
         
         return {
             'answer': response['answer'],
@@ -155,6 +237,38 @@ class EmpiricalRAGPipeline:
             'empirical_analysis': empirical_analysis
         }
     
+    def _token_counter(self, model: str) -> TokenCounter:
+        if model == self.tokenizer_model:
+            return self.chunker.token_counter
+        if model not in self._token_counters:
+            self._token_counters[model] = TokenCounter.for_model(model)
+        return self._token_counters[model]
+    
+    def _fit_context(self, question: str, chunks: List[Dict], extra_parts: List[str], use_llm: bool) -> List[str]:
+        # count with the generating model's tokenizer; parent token counts
+        # stored at index time are only valid when it is the chunker's
+        model = 'llm' if use_llm else 'slm'
+        token_counter = self._token_counter(model)
+        stored_counts = model == self.tokenizer_model
+        budget = self.llm_handler.max_input_tokens(use_llm) - token_counter.count(self.llm_handler.format_prompt(question, ""))
+        separator_tokens = token_counter.count("\n\n---\n\n")
+        
+        context_parts = []
+        used = 0
+        candidates = [(chunk['parent_text'], chunk.get('parent_token_count') if stored_counts else None)
+                      for chunk in chunks]
+        candidates.extend((part, None) for part in extra_parts)
+        for text, tokens in candidates:
+            if text in context_parts:
+                continue
+            tokens = tokens if tokens is not None else token_counter.count(text)
+            if context_parts and used + separator_tokens + tokens > budget:
+                continue
+            context_parts.append(text)
+            used += tokens + (separator_tokens if len(context_parts) > 1 else 0)
+        
+        return context_parts
+    
     def _build_empirical_analysis(self, question: str, entity_results: List[Dict], fact_results: List[Dict]) -> Dict:
         analysis = {
             'search_strategy': 'Hybrid Empirical Data Model',
@@ -205,7 +319,6 @@ class EmpiricalRAGPipeline:
             'vector_store_stats': self.vector_store.get_stats()
         }
     
-    def reload_documents(self) -> Dict:
-        self.vector_store.clear_all()
+    def reload_documents(self, force: bool = False) -> Dict:
         self.is_initialized = False
-        return self.initialize()
+        return self.initialize(force=force)
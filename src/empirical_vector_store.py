@@ -1,13 +1,19 @@
 import chromadb
 from chromadb.utils import embedding_functions
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set, Tuple
 from dataclasses import asdict
+import hashlib
 import json
 import os
+from src.near_duplicates import NearDuplicateIndex
+from src.typed_index import default_typed_indexes
+
+# parents are only ever fetched by id, so their rows carry a constant vector
+PARENT_EMBEDDING = [0.0]
 
 
 class EmpiricalVectorStore:
-    def __init__(self, persist_dir: str = "./chroma_empirical_db"):
+    def __init__(self, persist_dir: str = "./chroma_empirical_db", near_duplicate_distance: Optional[int] = 3):
         self.persist_dir = persist_dir
         self.client = chromadb.PersistentClient(path=persist_dir)
         self.embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
@@ -32,105 +38,323 @@ class EmpiricalVectorStore:
             metadata={"description": "Extracted facts and relationships"}
         )
         
-        self.parent_chunks: Dict[str, str] = {}
-        self.entity_index: Dict[str, List[str]] = {}
+        self.parents_collection = self.client.get_or_create_collection(
+            name="parents",
+            embedding_function=None,
+            metadata={"description": "Parent chunk text and entity mentions"}
+        )
+        
+        self.entity_postings: Dict[str, Dict[str, List[int]]] = {}
+        self.requires_rebuild = False
         self.fact_index: Dict[str, List[str]] = {}
+        self.provenance: Dict[str, List[Dict]] = {}
+        self.provenance_sources: Dict[str, Set[str]] = {}
+        self._dirty_provenance: Set[str] = set()
+        self.typed_indexes = default_typed_indexes()
+        self.near_duplicates = NearDuplicateIndex(near_duplicate_distance) if near_duplicate_distance is not None else None
+        self.legacy_paths = [os.path.join(persist_dir, name)
+                             for name in ("parent_chunks.json", "chunk_provenance.json", "entity_postings.json")]
+        self._load_state()
+
+    def _load_state(self):
+        # stores written before parents moved into Chroma kept them in JSON
+        if any(os.path.exists(path) for path in self.legacy_paths):
+            self.requires_rebuild = True
+        
+        if self.chunks_collection.count():
+            results = self.chunks_collection.get(include=['metadatas'])
+            for chunk_id, metadata in zip(results['ids'], results['metadatas']):
+                if 'simhash' in metadata and self.near_duplicates is not None:
+                    numbers = int(metadata['numhash'], 16) if 'numhash' in metadata else None
+                    self.near_duplicates.add(chunk_id, int(metadata['simhash'], 16), numbers)
+                if 'duplicates' in metadata:
+                    for duplicate in json.loads(metadata['duplicates']):
+                        self._index_provenance(chunk_id, duplicate)
+        
+        if self.parents_collection.count():
+            results = self.parents_collection.get(include=['metadatas'])
+            for parent_id, metadata in zip(results['ids'], results['metadatas']):
+                for entity_id, starts in json.loads(metadata.get('mentions', '{}')).items():
+                    self.entity_postings.setdefault(entity_id, {})[parent_id] = starts
+        
+        if self.entities_collection.count():
+            results = self.entities_collection.get(include=['metadatas'])
+            for entity_id, metadata in zip(results['ids'], results['metadatas']):
+                # stores written before canonical entities kept one row per mention
+                if 'parent_id' in metadata:
+                    self.requires_rebuild = True
+                elif 'value' in metadata:
+                    self.typed_indexes[metadata['entity_type']].add(metadata['value'], entity_id, metadata['entity_text'])
+        
+        if self.facts_collection.count():
+            results = self.facts_collection.get(include=['metadatas'])
+            for fact_id, metadata in zip(results['ids'], results['metadatas']):
+                self.fact_index.setdefault(metadata['subject'].lower(), []).append(fact_id)
+
+    def save(self):
+        # parents, postings and chunks are written as they change; only the
+        # provenance lists touched since the last save are flushed here
+        if not self._dirty_provenance:
+            return
+        ids = sorted(self._dirty_provenance)
+        self.chunks_collection.update(
+            ids=ids,
+            metadatas=[{'duplicates': json.dumps(self.provenance[chunk_id]) if chunk_id in self.provenance else None}
+                       for chunk_id in ids]
+        )
+        self._dirty_provenance.clear()
+
+    def _index_provenance(self, canonical_id: str, duplicate: Dict) -> bool:
+        duplicates = self.provenance.setdefault(canonical_id, [])
+        if any(entry['chunk_id'] == duplicate['chunk_id'] for entry in duplicates):
+            return False
+        duplicates.append(duplicate)
+        self.provenance_sources.setdefault(duplicate['source'], set()).add(canonical_id)
+        return True
+
+    def add_provenance(self, canonical_id: str, duplicate: Dict):
+        if self._index_provenance(canonical_id, duplicate):
+            self._dirty_provenance.add(canonical_id)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return list(self.embedding_fn(texts))
+
+    def entity_document(self, entity: Any) -> str:
+        return f"{entity.entity_type}: {entity.text}"
+
+    def canonical_entity(self, entity: Any) -> Tuple[str, Any]:
+        index = self.typed_indexes.get(entity.entity_type)
+        value = index.normalize(entity.text) if index is not None else None
+        key = f"{entity.entity_type}:{' '.join(entity.text.lower().split()) if value is None else value}"
+        return f"entity_{hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()}", value
+
+    def new_entities(self, entities: List[Any]) -> List[Any]:
+        new = {}
+        for entity in entities:
+            entity_id, _ = self.canonical_entity(entity)
+            if entity_id not in self.entity_postings:
+                new.setdefault(entity_id, entity)
+        return list(new.values())
+
+    def fact_document(self, fact: Any) -> str:
+        return f"{fact.subject} {fact.predicate} {fact.object}: {fact.source_text}"
 
-    def add_chunks(self, chunks: List[Dict], filename: str):
+    def chunk_store_id(self, chunk: Dict, filename: str) -> str:
+        return f"{filename}_{chunk['chunk_id']}"
+
+    def source_chunk_ids(self, source: str) -> set:
+        return set(self.chunks_collection.get(where={'source': source}, include=[])['ids'])
+
+    def existing_chunk_ids(self, ids: List[str]) -> set:
+        if not ids:
+            return set()
+        return set(self.chunks_collection.get(ids=ids, include=[])['ids'])
+
+    def add_chunks(self, chunks: List[Dict], filename: str, source: Optional[str] = None,
+                   embeddings: Optional[List[List[float]]] = None):
+        if not chunks:
+            return
+        source = source or filename
+        
+        unique = {}
+        for i, chunk in enumerate(chunks):
+            unique.setdefault(self.chunk_store_id(chunk, filename), i)
+        if len(unique) < len(chunks):
+            chunks = [chunks[i] for i in unique.values()]
+            embeddings = [embeddings[i] for i in unique.values()] if embeddings is not None else None
+        
+        self.chunks_collection.upsert(
+            ids=list(unique),
+            documents=[chunk['child_text'] for chunk in chunks],
+            embeddings=embeddings,
+            metadatas=[self._chunk_metadata(chunk, filename, source) for chunk in chunks]
+        )
+        
+        parents = {}
         for chunk in chunks:
-            chunk_id = f"{filename}_{chunk['chunk_id']}"
-            
-            self.chunks_collection.add(
-                ids=[chunk_id],
-                documents=[chunk['child_text']],
-                metadatas=[{
-                    'filename': filename,
-                    'chunk_id': chunk['chunk_id'],
-                    'parent_id': chunk['parent_id'],
-                    'chunk_type': 'child'
-                }]
-            )
-            
-            self.parent_chunks[chunk_id] = chunk['parent_text']
+            metadata = {'source': source}
+            if 'parent_token_count' in chunk:
+                metadata['token_count'] = chunk['parent_token_count']
+            parents.setdefault(chunk['parent_id'], (chunk['parent_text'], metadata))
+        self.parents_collection.upsert(
+            ids=list(parents),
+            documents=[text for text, _ in parents.values()],
+            embeddings=[PARENT_EMBEDDING] * len(parents),
+            metadatas=[metadata for _, metadata in parents.values()]
+        )
+    
+    def _chunk_metadata(self, chunk: Dict, filename: str, source: str) -> Dict:
+        metadata = {
+            'filename': filename,
+            'source': source,
+            'chunk_id': chunk['chunk_id'],
+            'parent_id': chunk['parent_id'],
+            'page': chunk.get('page', 1),
+            'unit': chunk.get('unit', 'page'),
+            'chunk_type': 'child'
+        }
+        if 'token_count' in chunk:
+            metadata['token_count'] = chunk['token_count']
+        if 'simhash' in chunk:
+            metadata['simhash'] = chunk['simhash']
+            metadata['numhash'] = chunk['numhash']
+        return metadata
 
-    def add_entities(self, entities: List[Any], chunk_id: str, filename: str, context: str):
-        for i, entity in enumerate(entities):
-            entity_id = f"{chunk_id}_entity_{i}"
-            
-            entity_context = f"{entity.entity_type}: {entity.text} (from: {context[:200]})"
-            
-            self.entities_collection.add(
-                ids=[entity_id],
-                documents=[entity_context],
-                metadatas=[{
-                    'filename': filename,
-                    'chunk_id': chunk_id,
+    def add_entities(self, entities: List[Any], parent_id: str, new_entities: Optional[List[Any]] = None,
+                     embeddings: Optional[List[List[float]]] = None):
+        if not entities:
+            return
+        if new_entities is None:
+            new_entities = self.new_entities(entities)
+        
+        if new_entities:
+            entity_ids = []
+            metadatas = []
+            for entity in new_entities:
+                entity_id, value = self.canonical_entity(entity)
+                metadata = {
                     'entity_type': entity.entity_type,
                     'entity_text': entity.text,
                     'confidence': entity.confidence
-                }]
-            )
+                }
+                if value is not None:
+                    metadata['value'] = value
+                    self.typed_indexes[entity.entity_type].add(value, entity_id, entity.text)
+                entity_ids.append(entity_id)
+                metadatas.append(metadata)
             
-            key = f"{entity.entity_type}:{entity.text.lower()}"
-            if key not in self.entity_index:
-                self.entity_index[key] = []
-            self.entity_index[key].append(entity_id)
-
-    def add_facts(self, facts: List[Any], chunk_id: str, filename: str):
-        for i, fact in enumerate(facts):
-            fact_id = f"{chunk_id}_fact_{i}"
-            
-            fact_text = f"{fact.subject} {fact.predicate} {fact.object}: {fact.source_text}"
-            
-            self.facts_collection.add(
-                ids=[fact_id],
-                documents=[fact_text],
-                metadatas=[{
-                    'filename': filename,
-                    'chunk_id': chunk_id,
-                    'subject': fact.subject,
-                    'predicate': fact.predicate,
-                    'object': fact.object,
-                    'confidence': fact.confidence,
-                    'source_text': fact.source_text[:500]
-                }]
+            self.entities_collection.upsert(
+                ids=entity_ids,
+                documents=[self.entity_document(entity) for entity in new_entities],
+                embeddings=embeddings,
+                metadatas=metadatas
             )
-            
+        
+        # postings map each canonical entity to the parents it occurs in and
+        # the start offset of every mention there
+        mentions: Dict[str, List[int]] = {}
+        for entity in entities:
+            mentions.setdefault(self.canonical_entity(entity)[0], []).append(entity.start)
+        for entity_id, starts in mentions.items():
+            self.entity_postings.setdefault(entity_id, {})[parent_id] = starts
+        self.parents_collection.update(ids=[parent_id], metadatas=[{'mentions': json.dumps(mentions)}])
+
+    def add_facts(self, facts: List[Any], parent_id: str, filename: str, source: Optional[str] = None,
+                  embeddings: Optional[List[List[float]]] = None):
+        if not facts:
+            return
+        fact_ids = [f"{parent_id}_fact_{i}" for i in range(len(facts))]
+        
+        self.facts_collection.upsert(
+            ids=fact_ids,
+            documents=[self.fact_document(fact) for fact in facts],
+            embeddings=embeddings,
+            metadatas=[{
+                'filename': filename,
+                'source': source or filename,
+                'parent_id': parent_id,
+                'subject': fact.subject,
+                'predicate': fact.predicate,
+                'object': fact.object,
+                'confidence': fact.confidence,
+                'source_text': fact.source_text[:500]
+            } for fact in facts]
+        )
+        
+        for fact_id, fact in zip(fact_ids, facts):
             subj_key = fact.subject.lower()
             if subj_key not in self.fact_index:
                 self.fact_index[subj_key] = []
             self.fact_index[subj_key].append(fact_id)
 
-    def search_chunks(self, query: str, top_k: int = 5) -> List[Dict]:
+    def entities_in_range(self, entity_type: str, low: Any = None, high: Any = None) -> List[Dict]:
+        results = []
+        for value, entity_id, text in self.typed_indexes[entity_type].range(low, high):
+            postings = self.entity_postings.get(entity_id, {})
+            results.append({
+                'entity_id': entity_id,
+                'entity_type': entity_type,
+                'entity_text': text,
+                'value': value,
+                'mentions': sum(len(starts) for starts in postings.values()),
+                'parent_ids': sorted(postings)
+            })
+        return results
+
+    def parents_in_ranges(self, ranges: Dict[str, Tuple[Any, Any]]) -> Set[str]:
+        parent_ids = None
+        for entity_type, (low, high) in ranges.items():
+            matched = set()
+            for _, entity_id, _ in self.typed_indexes[entity_type].range(low, high):
+                matched.update(self.entity_postings.get(entity_id, ()))
+            parent_ids = matched if parent_ids is None else parent_ids & matched
+            if not parent_ids:
+                break
+        return parent_ids or set()
+
+    def _where(self, parent_ids: Optional[Set[str]]) -> Optional[Dict]:
+        return {'parent_id': {'$in': sorted(parent_ids)}} if parent_ids is not None else None
+
+    def search_chunks(self, query: str, top_k: int = 5, parent_ids: Optional[Set[str]] = None) -> List[Dict]:
+        if parent_ids is not None and not parent_ids:
+            return []
         results = self.chunks_collection.query(
             query_texts=[query],
-            n_results=top_k
+            n_results=top_k,
+            where=self._where(parent_ids)
         )
         
         search_results = []
         if results['ids'] and results['ids'][0]:
+            parents = self.get_parents({metadata['parent_id'] for metadata in results['metadatas'][0]})
             for i, chunk_id in enumerate(results['ids'][0]):
-                parent_text = self.parent_chunks.get(chunk_id, results['documents'][0][i])
+                parent = parents.get(results['metadatas'][0][i]['parent_id'])
+                parent_text = parent['text'] if parent else results['documents'][0][i]
                 distance = results['distances'][0][i] if results['distances'] else 0
                 relevance = 1 / (1 + distance)
                 
                 search_results.append({
                     'chunk_id': chunk_id,
+                    'parent_id': results['metadatas'][0][i]['parent_id'],
                     'child_text': results['documents'][0][i],
                     'parent_text': parent_text,
+                    'parent_token_count': parent.get('token_count') if parent else None,
                     'filename': results['metadatas'][0][i]['filename'],
+                    'page': results['metadatas'][0][i].get('page', 1),
+                    'unit': results['metadatas'][0][i].get('unit', 'page'),
+                    'duplicates': self.provenance.get(chunk_id, []),
                     'relevance_score': relevance
                 })
         
         return search_results
 
-    def search_entities(self, query: str, entity_type: Optional[str] = None, top_k: int = 10) -> List[Dict]:
+    def get_parents(self, parent_ids: Set[str]) -> Dict[str, Dict]:
+        if not parent_ids:
+            return {}
+        results = self.parents_collection.get(ids=sorted(parent_ids), include=['documents', 'metadatas'])
+        return {
+            parent_id: {'text': text, 'source': metadata['source'], 'token_count': metadata.get('token_count')}
+            for parent_id, text, metadata in zip(results['ids'], results['documents'], results['metadatas'])
+        }
+
+    def search_entities(self, query: str, entity_type: Optional[str] = None, top_k: int = 10,
+                        parent_ids: Optional[Set[str]] = None) -> List[Dict]:
+        entity_ids = None
+        if parent_ids is not None:
+            entity_ids = [entity_id for entity_id, postings in self.entity_postings.items()
+                          if not parent_ids.isdisjoint(postings)]
+            if not entity_ids:
+                return []
+        
         where_filter = None
         if entity_type:
             where_filter = {"entity_type": entity_type}
         
         results = self.entities_collection.query(
             query_texts=[query],
+            ids=entity_ids,
             n_results=top_k,
             where=where_filter
         )
@@ -140,22 +364,27 @@ class EmpiricalVectorStore:
             for i, entity_id in enumerate(results['ids'][0]):
                 distance = results['distances'][0][i] if results['distances'] else 0
                 relevance = 1 / (1 + distance)
+                postings = self.entity_postings.get(entity_id, {})
                 
                 entity_results.append({
                     'entity_id': entity_id,
                     'context': results['documents'][0][i],
                     'entity_type': results['metadatas'][0][i]['entity_type'],
                     'entity_text': results['metadatas'][0][i]['entity_text'],
-                    'filename': results['metadatas'][0][i]['filename'],
+                    'mentions': sum(len(starts) for starts in postings.values()),
+                    'parent_ids': sorted(postings),
                     'relevance_score': relevance
                 })
         
         return entity_results
 
-    def search_facts(self, query: str, top_k: int = 10) -> List[Dict]:
+    def search_facts(self, query: str, top_k: int = 10, parent_ids: Optional[Set[str]] = None) -> List[Dict]:
+        if parent_ids is not None and not parent_ids:
+            return []
         results = self.facts_collection.query(
             query_texts=[query],
-            n_results=top_k
+            n_results=top_k,
+            where=self._where(parent_ids)
         )
         
         fact_results = []
@@ -173,15 +402,17 @@ class EmpiricalVectorStore:
                     'object': metadata['object'],
                     'source_text': metadata['source_text'],
                     'filename': metadata['filename'],
+                    'parent_id': metadata.get('parent_id'),
                     'relevance_score': relevance
                 })
         
         return fact_results
 
-    def hybrid_search(self, query: str, top_k: int = 5) -> Dict:
-        chunk_results = self.search_chunks(query, top_k)
-        entity_results = self.search_entities(query, top_k=top_k)
-        fact_results = self.search_facts(query, top_k=top_k)
+    def hybrid_search(self, query: str, top_k: int = 5, ranges: Optional[Dict[str, Tuple[Any, Any]]] = None) -> Dict:
+        parent_ids = self.parents_in_ranges(ranges) if ranges else None
+        chunk_results = self.search_chunks(query, top_k, parent_ids=parent_ids)
+        entity_results = self.search_entities(query, top_k=top_k, parent_ids=parent_ids)
+        fact_results = self.search_facts(query, top_k=top_k, parent_ids=parent_ids)
         
         return {
             'chunks': chunk_results,
@@ -195,15 +426,121 @@ class EmpiricalVectorStore:
             'chunks_count': self.chunks_collection.count(),
             'entities_count': self.entities_collection.count(),
             'facts_count': self.facts_collection.count(),
-            'parent_chunks_cached': len(self.parent_chunks),
-            'entity_index_keys': len(self.entity_index),
-            'fact_index_keys': len(self.fact_index)
+            'parent_chunks': self.parents_collection.count(),
+            'entity_index_keys': len(self.entity_postings),
+            'entity_mentions': sum(len(starts) for postings in self.entity_postings.values() for starts in postings.values()),
+            'fact_index_keys': len(self.fact_index),
+            'typed_index_entries': {entity_type: len(index) for entity_type, index in self.typed_indexes.items()}
+        }
+
+    def delete_source(self, source: str, keep_chunk_ids: Optional[set] = None) -> set:
+        if keep_chunk_ids is None:
+            stale_chunk_ids = self.chunks_collection.get(where={'source': source}, include=[])['ids']
+            fact_ids = set(self.facts_collection.get(where={'source': source}, include=[])['ids'])
+            
+            self.chunks_collection.delete(where={'source': source})
+            self.facts_collection.delete(where={'source': source})
+            kept_parents = set()
+            keep_chunk_ids = set()
+        else:
+            chunks = self.chunks_collection.get(where={'source': source}, include=['metadatas'])
+            kept_parents = {
+                metadata['parent_id'] for chunk_id, metadata in zip(chunks['ids'], chunks['metadatas'])
+                if chunk_id in keep_chunk_ids
+            }
+            stale_chunk_ids = [chunk_id for chunk_id in chunks['ids'] if chunk_id not in keep_chunk_ids]
+            fact_ids = self._stale_ids(self.facts_collection, source, kept_parents)
+            
+            for collection, ids in [(self.chunks_collection, stale_chunk_ids),
+                                    (self.facts_collection, list(fact_ids))]:
+                if ids:
+                    collection.delete(ids=ids)
+        
+        parents = self.parents_collection.get(where={'source': source}, include=['metadatas'])
+        stale_parents = {
+            parent_id: metadata for parent_id, metadata in zip(parents['ids'], parents['metadatas'])
+            if parent_id not in kept_parents
+        }
+        if stale_parents:
+            self.parents_collection.delete(ids=list(stale_parents))
+        entity_ids = self._prune_postings(stale_parents)
+        if entity_ids:
+            self.entities_collection.delete(ids=list(entity_ids))
+        
+        for index in self.typed_indexes.values():
+            index.remove(entity_ids)
+        self.fact_index = self._prune_index(self.fact_index, fact_ids)
+        return self._prune_provenance(source, stale_chunk_ids, keep_chunk_ids)
+
+    def _prune_provenance(self, source: str, stale_chunk_ids: List[str], keep_chunk_ids: set) -> set:
+        orphaned = set()
+        for chunk_id in stale_chunk_ids:
+            if self.near_duplicates is not None:
+                self.near_duplicates.remove(chunk_id)
+            self._dirty_provenance.discard(chunk_id)
+            for duplicate in self.provenance.pop(chunk_id, []):
+                self.provenance_sources.get(duplicate['source'], set()).discard(chunk_id)
+                if duplicate['source'] != source:
+                    orphaned.add(duplicate['source'])
+        
+        still_pointing = set()
+        for canonical_id in self.provenance_sources.pop(source, set()):
+            duplicates = self.provenance.get(canonical_id)
+            if duplicates is None:
+                continue
+            kept = [
+                duplicate for duplicate in duplicates
+                if duplicate['source'] != source or duplicate['chunk_id'] in keep_chunk_ids
+            ]
+            if len(kept) < len(duplicates):
+                self._dirty_provenance.add(canonical_id)
+            if any(duplicate['source'] == source for duplicate in kept):
+                still_pointing.add(canonical_id)
+            if kept:
+                self.provenance[canonical_id] = kept
+            else:
+                del self.provenance[canonical_id]
+        if still_pointing:
+            self.provenance_sources[source] = still_pointing
+        return orphaned
+
+    def _stale_ids(self, collection, source: str, kept_parents: set) -> set:
+        results = collection.get(where={'source': source}, include=['metadatas'])
+        return {
+            item_id for item_id, metadata in zip(results['ids'], results['metadatas'])
+            if metadata.get('parent_id') not in kept_parents
         }
 
+    def _prune_postings(self, stale_parents: Dict[str, Dict]) -> set:
+        # each parent row lists the entities it mentions, so only their
+        # postings need touching
+        emptied = set()
+        for parent_id, metadata in stale_parents.items():
+            for entity_id in json.loads(metadata.get('mentions', '{}')):
+                postings = self.entity_postings.get(entity_id)
+                if postings is None:
+                    continue
+                postings.pop(parent_id, None)
+                if not postings:
+                    emptied.add(entity_id)
+                    del self.entity_postings[entity_id]
+        return emptied
+
+    def _prune_index(self, index: Dict[str, List[str]], removed_ids: set) -> Dict[str, List[str]]:
+        if not removed_ids:
+            return index
+        pruned = {}
+        for key, ids in index.items():
+            kept = [item_id for item_id in ids if item_id not in removed_ids]
+            if kept:
+                pruned[key] = kept
+        return pruned
+
     def clear_all(self):
         self.client.delete_collection("chunks")
         self.client.delete_collection("entities")
         self.client.delete_collection("facts")
+        self.client.delete_collection("parents")
         
         self.chunks_collection = self.client.get_or_create_collection(
             name="chunks",
@@ -217,7 +554,21 @@ class EmpiricalVectorStore:
             name="facts",
             embedding_function=self.embedding_fn
         )
+        self.parents_collection = self.client.get_or_create_collection(
+            name="parents",
+            embedding_function=None
+        )
+        for path in self.legacy_paths:
+            if os.path.exists(path):
+                os.remove(path)
         
-        self.parent_chunks.clear()
-        self.entity_index.clear()
+        self.entity_postings.clear()
+        self.requires_rebuild = False
         self.fact_index.clear()
+        self.provenance.clear()
+        self.provenance_sources.clear()
+        self._dirty_provenance.clear()
+        for index in self.typed_indexes.values():
+            index.clear()
+        if self.near_duplicates is not None:
+            self.near_duplicates.clear()
@@ -1,10 +1,18 @@
+import os
 import re
-from typing import Dict, List, Tuple
+from array import array
+from bisect import bisect_right
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 from dataclasses import dataclass
 from datetime import datetime
+from src.entity_scanner import EntityScanner
+from src.tabular_extractor import DEFAULT_TABLE_SCHEMAS, TableSchema, TabularEntityExtractor
 
+SENTENCE_BREAK = re.compile(r'[.!?]\s+')
 
-@dataclass
+
+@dataclass(slots=True)
 class Entity:
     text: str
     entity_type: str
@@ -13,7 +21,7 @@ class Entity:
     confidence: float
 
 
-@dataclass
+@dataclass(slots=True)
 class Fact:
     subject: str
     predicate: str
@@ -22,8 +30,153 @@ class Fact:
     confidence: float
 
 
-class EntityExtractor:
+class ExtractionSet:
+    __slots__ = ('strings', 'entity_types', 'predicates', '_string_codes', '_type_codes', '_predicate_codes',
+                 'entity_offsets', 'entity_texts', 'entity_type_codes', 'entity_starts', 'entity_ends', 'entity_confidences',
+                 'fact_offsets', 'fact_subjects', 'fact_predicate_codes', 'fact_objects', 'fact_sources', 'fact_confidences')
+    _CODE_TABLES = (('strings', '_string_codes'), ('entity_types', '_type_codes'), ('predicates', '_predicate_codes'))
+    
     def __init__(self):
+        self.strings: List[str] = []
+        self.entity_types: List[str] = []
+        self.predicates: List[str] = []
+        self._string_codes: Dict[str, int] = {}
+        self._type_codes: Dict[str, int] = {}
+        self._predicate_codes: Dict[str, int] = {}
+        self.entity_offsets = array('q', [0])
+        self.entity_texts = array('q')
+        self.entity_type_codes = array('q')
+        self.entity_starts = array('q')
+        self.entity_ends = array('q')
+        self.entity_confidences = array('d')
+        self.fact_offsets = array('q', [0])
+        self.fact_subjects = array('q')
+        self.fact_predicate_codes = array('q')
+        self.fact_objects = array('q')
+        self.fact_sources = array('q')
+        self.fact_confidences = array('d')
+    
+    def __getstate__(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__ if not name.startswith('_')}
+    
+    def __setstate__(self, state: Dict):
+        for name, value in state.items():
+            setattr(self, name, value)
+        for table, codes in self._CODE_TABLES:
+            setattr(self, codes, {value: code for code, value in enumerate(getattr(self, table))})
+    
+    def __len__(self) -> int:
+        return len(self.entity_offsets) - 1
+    
+    def __iter__(self) -> Iterator[Tuple[List[Entity], List[Fact]]]:
+        for record in range(len(self)):
+            yield self.entities(record), self.facts(record)
+    
+    @property
+    def entity_count(self) -> int:
+        return len(self.entity_starts)
+    
+    @property
+    def fact_count(self) -> int:
+        return len(self.fact_subjects)
+    
+    def _code(self, table: List[str], codes: Dict[str, int], value: str) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(table)
+            table.append(value)
+        return code
+    
+    def add(self, entities: Iterable[Entity], facts: Iterable[Fact]) -> int:
+        for entity in entities:
+            self.entity_texts.append(self._code(self.strings, self._string_codes, entity.text))
+            self.entity_type_codes.append(self._code(self.entity_types, self._type_codes, entity.entity_type))
+            self.entity_starts.append(entity.start)
+            self.entity_ends.append(entity.end)
+            self.entity_confidences.append(entity.confidence)
+        for fact in facts:
+            self.fact_subjects.append(self._code(self.strings, self._string_codes, fact.subject))
+            self.fact_predicate_codes.append(self._code(self.predicates, self._predicate_codes, fact.predicate))
+            self.fact_objects.append(self._code(self.strings, self._string_codes, fact.object))
+            self.fact_sources.append(self._code(self.strings, self._string_codes, fact.source_text))
+            self.fact_confidences.append(fact.confidence)
+        self.entity_offsets.append(len(self.entity_starts))
+        self.fact_offsets.append(len(self.fact_subjects))
+        return len(self) - 1
+    
+    def extend(self, other: 'ExtractionSet'):
+        strings = [self._code(self.strings, self._string_codes, value) for value in other.strings]
+        types = [self._code(self.entity_types, self._type_codes, value) for value in other.entity_types]
+        predicates = [self._code(self.predicates, self._predicate_codes, value) for value in other.predicates]
+        entity_base = len(self.entity_starts)
+        fact_base = len(self.fact_subjects)
+        
+        self.entity_texts.extend(strings[code] for code in other.entity_texts)
+        self.entity_type_codes.extend(types[code] for code in other.entity_type_codes)
+        self.entity_starts.extend(other.entity_starts)
+        self.entity_ends.extend(other.entity_ends)
+        self.entity_confidences.extend(other.entity_confidences)
+        self.fact_subjects.extend(strings[code] for code in other.fact_subjects)
+        self.fact_predicate_codes.extend(predicates[code] for code in other.fact_predicate_codes)
+        self.fact_objects.extend(strings[code] for code in other.fact_objects)
+        self.fact_sources.extend(strings[code] for code in other.fact_sources)
+        self.fact_confidences.extend(other.fact_confidences)
+        self.entity_offsets.extend(entity_base + offset for offset in other.entity_offsets[1:])
+        self.fact_offsets.extend(fact_base + offset for offset in other.fact_offsets[1:])
+    
+    def entity(self, index: int) -> Entity:
+        return Entity(
+            text=self.strings[self.entity_texts[index]],
+            entity_type=self.entity_types[self.entity_type_codes[index]],
+            start=self.entity_starts[index],
+            end=self.entity_ends[index],
+            confidence=self.entity_confidences[index]
+        )
+    
+    def fact(self, index: int) -> Fact:
+        return Fact(
+            subject=self.strings[self.fact_subjects[index]],
+            predicate=self.predicates[self.fact_predicate_codes[index]],
+            object=self.strings[self.fact_objects[index]],
+            source_text=self.strings[self.fact_sources[index]],
+            confidence=self.fact_confidences[index]
+        )
+    
+    def entities(self, record: int) -> List[Entity]:
+        return [self.entity(index) for index in range(self.entity_offsets[record], self.entity_offsets[record + 1])]
+    
+    def facts(self, record: int) -> List[Fact]:
+        return [self.fact(index) for index in range(self.fact_offsets[record], self.fact_offsets[record + 1])]
+    
+    def iter_entities(self) -> Iterator[Entity]:
+        return (self.entity(index) for index in range(self.entity_count))
+    
+    def iter_facts(self) -> Iterator[Fact]:
+        return (self.fact(index) for index in range(self.fact_count))
+
+
+_worker_extractor = None
+
+
+def _init_worker(extractor: 'EntityExtractor'):
+    global _worker_extractor
+    _worker_extractor = extractor
+
+
+def _extract_set(texts: List[str]) -> ExtractionSet:
+    extraction_set = ExtractionSet()
+    for text in texts:
+        extraction_set.add(*_worker_extractor.extract(text))
+    return extraction_set
+
+
+class EntityExtractor:
+    def __init__(self, use_scanner: bool = True, workers: Optional[int] = 1, batch_size: int = 8,
+                 table_schemas: Optional[List[TableSchema]] = None):
+        self.use_scanner = use_scanner
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.tabular = TabularEntityExtractor(DEFAULT_TABLE_SCHEMAS if table_schemas is None else table_schemas)
         self.date_patterns = [
             r'\b(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})\b',
             r'\b(\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})\b',
@@ -66,8 +219,23 @@ class EntityExtractor:
             r'\b(\$[\d,]+(?:\.\d{2})?)\b',
             r'\b(₹[\d,]+(?:\.\d{2})?)\b',
         ]
+        
+        self.scanner = EntityScanner()
+        self.scanner.add_patterns('DATE', self.date_patterns, 0.9, re.IGNORECASE)
+        self.scanner.add_patterns('ID', self.id_patterns, 0.95, re.IGNORECASE, str.upper)
+        self.scanner.add_keywords('STATUS', self.status_keywords, 0.85, str.lower)
+        self.scanner.add_keywords('DEPARTMENT', self.department_keywords, 0.85, str.title, suffix=r'\s+department')
+        self.scanner.add_patterns('PERSON', self.title_patterns, 0.8)
+        self.scanner.add_patterns('MONEY', self.money_patterns, 0.9)
 
     def extract_entities(self, text: str) -> List[Entity]:
+        if self.use_scanner:
+            entities = [Entity(*fields) for fields in self.scanner.scan(text)]
+        else:
+            entities = self._scan_per_pattern(text)
+        return self._deduplicate_entities(entities)
+
+    def _scan_per_pattern(self, text: str) -> List[Entity]:
         entities = []
         
         for pattern in self.date_patterns:
@@ -132,7 +300,6 @@ class EntityExtractor:
                     confidence=0.9
                 ))
         
-        entities = self._deduplicate_entities(entities)
         return entities
 
     def _deduplicate_entities(self, entities: List[Entity]) -> List[Entity]:
@@ -142,23 +309,45 @@ class EntityExtractor:
         entities.sort(key=lambda e: (e.start, -e.confidence))
         result = []
         
+        # accepted entities never overlap and arrive in start order, so a
+        # candidate overlaps one of them only if it starts before the last end
+        last_end = None
         for entity in entities:
-            overlap = False
-            for existing in result:
-                if not (entity.end <= existing.start or entity.start >= existing.end):
-                    overlap = True
-                    break
-            if not overlap:
+            if last_end is None or entity.start >= last_end:
                 result.append(entity)
+                last_end = entity.end
         
         return result
 
+    def sentence_spans(self, text: str, entities: Sequence[Entity] = ()) -> List[Tuple[int, int]]:
+        spans = []
+        start = 0
+        index = 0
+        for match in SENTENCE_BREAK.finditer(text):
+            while index < len(entities) and entities[index].end <= match.start():
+                index += 1
+            if index < len(entities) and entities[index].start <= match.start():
+                continue
+            spans.append((start, match.start()))
+            start = match.end()
+        spans.append((start, len(text)))
+        return spans
+
     def extract_facts(self, text: str, entities: List[Entity]) -> List[Fact]:
         facts = []
-        sentences = re.split(r'[.!?]\s+', text)
+        # entities are placed by offset, and a break inside one ("Mr. Sharma")
+        # does not end its sentence
+        entities = sorted(entities, key=lambda e: e.start)
+        spans = self.sentence_spans(text, entities)
+        span_starts = [start for start, _ in spans]
+        entities_by_sentence = [[] for _ in spans]
+        for entity in entities:
+            entities_by_sentence[bisect_right(span_starts, entity.start) - 1].append(entity)
         
-        for sentence in sentences:
-            sentence_entities = [e for e in entities if e.text.lower() in sentence.lower()]
+        for (start, end), sentence_entities in zip(spans, entities_by_sentence):
+            if not sentence_entities:
+                continue
+            sentence = text[start:end]
             
             persons = [e for e in sentence_entities if e.entity_type == 'PERSON']
             statuses = [e for e in sentence_entities if e.entity_type == 'STATUS']
@@ -206,6 +395,48 @@ class EntityExtractor:
         
         return facts
 
+    def extract(self, text: str) -> Tuple[List[Entity], List[Fact]]:
+        tabular = self.tabular.extract(text)
+        if tabular is None:
+            entities = self.extract_entities(text)
+            return entities, self.extract_facts(text, entities)
+        
+        entity_rows, fact_rows, unmatched = tabular
+        entities = [Entity(*row) for row in entity_rows]
+        facts = [Fact(*row) for row in fact_rows]
+        for start, end in unmatched:
+            segment = text[start:end]
+            segment_entities = self.extract_entities(segment)
+            facts.extend(self.extract_facts(segment, segment_entities))
+            for entity in segment_entities:
+                entity.start += start
+                entity.end += start
+            entities.extend(segment_entities)
+        entities.sort(key=lambda e: e.start)
+        return entities, facts
+
+    def create_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self,))
+
+    def extract_batch(self, texts: Sequence[str], executor: Optional[Executor] = None) -> ExtractionSet:
+        texts = list(texts)
+        extraction_set = ExtractionSet()
+        if executor is None and (self.workers <= 1 or len(texts) <= 1):
+            for text in texts:
+                extraction_set.add(*self.extract(text))
+            return extraction_set
+        
+        pool = executor or self.create_pool()
+        try:
+            futures = [pool.submit(_extract_set, texts[i:i + self.batch_size])
+                       for i in range(0, len(texts), self.batch_size)]
+            for future in futures:
+                extraction_set.extend(future.result())
+        finally:
+            if executor is None:
+                pool.shutdown()
+        return extraction_set
+
     def create_entity_summary(self, entities: List[Entity], facts: List[Fact]) -> Dict:
         summary = {
             'entity_counts': {},
@@ -0,0 +1,150 @@
+import re
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+WORD = re.compile(r"\w+")
+KEYWORD = re.compile(r"\w(?:.*\w)?", re.DOTALL)
+INLINE_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'), (re.VERBOSE, 'x'))
+# re.IGNORECASE matches these against ASCII letters but str.lower() does not map them there
+SPECIAL_FOLDS = re.compile("[İıſ]")
+
+ScanResult = Tuple[str, str, int, int, float]
+
+
+class KeywordAutomaton:
+    def __init__(self, keywords: Sequence[str]):
+        self.keywords = [keyword.lower() for keyword in keywords]
+        self.word_counts = [len(WORD.findall(keyword)) for keyword in self.keywords]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for word in WORD.findall(keyword):
+                if word not in self._goto[state]:
+                    self._goto[state][word] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = self._goto[state][word]
+            self._output[state].append(index)
+
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for word, next_state in self._goto[state].items():
+                pending.append(next_state)
+                fail = self._fail[state]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(word, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text: str, lowered: str) -> Iterator[Tuple[int, int, int]]:
+        state = 0
+        starts = []
+        for token in WORD.finditer(text):
+            start, end = token.span()
+            word = lowered[start:end]
+            while state and word not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(word, 0)
+            starts.append(start)
+            for index in self._output[state]:
+                keyword_start = starts[-self.word_counts[index]]
+                if lowered[keyword_start:end] == self.keywords[index]:
+                    yield index, keyword_start, end
+
+
+class EntityScanner:
+    def __init__(self):
+        self._rules: List[Tuple[str, float, Optional[Callable[[str], str]]]] = []
+        self._patterns: List[Tuple[int, re.Pattern]] = []
+        self._keywords: List[Tuple[int, str, Optional[re.Pattern], re.Pattern]] = []
+        self._combined: Optional[re.Pattern] = None
+        self._automaton: Optional[KeywordAutomaton] = None
+
+    def add_patterns(self, entity_type: str, patterns: Sequence[str], confidence: float,
+                     flags: int = 0, normalize: Optional[Callable[[str], str]] = None):
+        for pattern in patterns:
+            self._patterns.append((len(self._rules), re.compile(pattern, flags)))
+            self._rules.append((entity_type, confidence, normalize))
+
+        # hoisting a shared leading \b out of the alternation lets the engine
+        # reject most positions before trying any alternative
+        prefix = r'\b' if all(compiled.pattern.startswith(r'\b') for _, compiled in self._patterns) else ''
+        alternatives = []
+        for index, (_, compiled) in enumerate(self._patterns):
+            body = compiled.pattern[len(prefix):]
+            inline = ''.join(letter for flag, letter in INLINE_FLAGS if compiled.flags & flag)
+            alternatives.append(f"(?P<p{index}>(?{inline}:{body}))" if inline else f"(?P<p{index}>{body})")
+        self._combined = re.compile(prefix + '(?:' + '|'.join(alternatives) + ')')
+
+    def add_keywords(self, entity_type: str, keywords: Sequence[str], confidence: float,
+                     normalize: Optional[Callable[[str], str]] = None, suffix: Optional[str] = None):
+        suffix_pattern = re.compile(suffix + r'\b', re.IGNORECASE) if suffix else None
+        for keyword in keywords:
+            if not keyword.isascii() or not KEYWORD.fullmatch(keyword):
+                raise ValueError(f"Keywords must be ASCII and start and end with a word character: {keyword!r}")
+            fallback = re.compile(r'\b(' + re.escape(keyword) + (f'(?:{suffix})?' if suffix else '') + r')\b',
+                                  re.IGNORECASE)
+            self._keywords.append((len(self._rules), keyword, suffix_pattern, fallback))
+            self._rules.append((entity_type, confidence, normalize))
+
+        self._automaton = KeywordAutomaton([keyword for _, keyword, _, _ in self._keywords])
+
+    def scan(self, text: str) -> List[ScanResult]:
+        found = self._scan_patterns(text) + self._scan_keywords(text)
+        found.sort()
+        return [(value, entity_type, start, end, confidence)
+                for _, start, end, value, entity_type, confidence in found]
+
+    def _result(self, rank: int, start: int, end: int, value: str) -> Tuple:
+        entity_type, confidence, normalize = self._rules[rank]
+        return rank, start, end, normalize(value) if normalize else value, entity_type, confidence
+
+    def _scan_patterns(self, text: str) -> List[Tuple]:
+        found = []
+        if self._combined is None:
+            return found
+
+        # the alternation reports one pattern per position, so every pattern is
+        # retried there; next_start keeps each one's finditer semantics
+        next_start = [0] * len(self._patterns)
+        match = self._combined.search(text)
+        while match:
+            position = match.start()
+            for index in range(int(match.lastgroup[1:]), len(self._patterns)):
+                if position < next_start[index]:
+                    continue
+                rank, pattern = self._patterns[index]
+                pattern_match = pattern.match(text, position)
+                if pattern_match:
+                    next_start[index] = pattern_match.end()
+                    found.append(self._result(rank, position, pattern_match.end(), pattern_match.group(1)))
+            match = self._combined.search(text, position + 1)
+        return found
+
+    def _scan_keywords(self, text: str) -> List[Tuple]:
+        found = []
+        if self._automaton is None:
+            return found
+
+        if SPECIAL_FOLDS.search(text):
+            for rank, _, _, fallback in self._keywords:
+                for match in fallback.finditer(text):
+                    found.append(self._result(rank, match.start(), match.end(), match.group(1)))
+            return found
+
+        next_start = [0] * len(self._keywords)
+        for index, start, end in self._automaton.iter_matches(text, text.lower()):
+            if start < next_start[index]:
+                continue
+            rank, _, suffix_pattern, _ = self._keywords[index]
+            suffix = suffix_pattern.match(text, end) if suffix_pattern else None
+            if suffix:
+                end = suffix.end()
+            next_start[index] = end
+            found.append(self._result(rank, start, end, text[start:end]))
+        return found
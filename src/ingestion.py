@@ -0,0 +1,375 @@
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+from src.instrumentation import IngestionReport
+
+_DONE = object()
+
+
+class IngestionAborted(Exception):
+    pass
+
+
+class _StaleIds:
+    def __init__(self, stored: set, seen: set):
+        self.stored = stored
+        self.seen = seen
+    
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self.stored and chunk_id not in self.seen
+
+
+class MemoryBudget:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.in_use = 0
+        self.loaded = 0
+        self.peak = 0
+        self._condition = threading.Condition()
+    
+    def acquire(self, size: int, stop_event: threading.Event, loaded: bool = False) -> int:
+        # loaded pages only drain once the chunker moves on, so the chunker
+        # never waits on them alone
+        with self._condition:
+            while (self.in_use if loaded else self.in_use - self.loaded) > 0 and self.in_use + size > self.max_bytes:
+                if stop_event.is_set():
+                    raise IngestionAborted()
+                self._condition.wait(timeout=0.1)
+            self.in_use += size
+            if loaded:
+                self.loaded += size
+            self.peak = max(self.peak, self.in_use)
+            return size
+    
+    def release(self, size: int, loaded: bool = False):
+        with self._condition:
+            self.in_use -= size
+            if loaded:
+                self.loaded -= size
+            self._condition.notify_all()
+
+
+class StagedIngestor:
+    def __init__(self, document_loader, chunker, entity_extractor, vector_store,
+                 memory_budget_bytes: int = 256 * 1024 * 1024, queue_size: int = 32,
+                 stage_workers: Optional[Dict[str, int]] = None, log_path: Optional[str] = None):
+        self.document_loader = document_loader
+        self.chunker = chunker
+        self.entity_extractor = entity_extractor
+        self.vector_store = vector_store
+        self.memory_budget_bytes = memory_budget_bytes
+        self.queue_size = queue_size
+        self.stage_workers = {'extract': max(entity_extractor.workers, 2), 'embed': 1, **(stage_workers or {})}
+        self.log_path = log_path
+    
+    def run(self, files: List[Path]) -> Dict:
+        self._stop_event = threading.Event()
+        self._errors: List[BaseException] = []
+        self._budget = MemoryBudget(self.memory_budget_bytes)
+        self._report = IngestionReport()
+        self._seen_lock = threading.Lock()
+        self.chunk_ids_by_source: Dict[str, set] = {}
+        self._stored_ids_by_source: Dict[str, set] = {}
+        self._extract_pool = self.entity_extractor.create_pool() if self.entity_extractor.workers > 1 else None
+        self._stats = {
+            'total_chunks': 0,
+            'chunks_reused': 0,
+            'near_duplicates': 0,
+            'total_entities': 0,
+            'entities_embedded': 0,
+            'total_facts': 0,
+            'entities_by_type': {}
+        }
+        
+        pages = queue.Queue(maxsize=self.queue_size)
+        parents = queue.Queue(maxsize=self.queue_size)
+        extracted = queue.Queue(maxsize=self.queue_size)
+        embedded = queue.Queue(maxsize=self.queue_size)
+        
+        stages = [
+            ('load', lambda: self._load_stage(files, pages), 1, [pages]),
+            ('chunk', lambda: self._chunk_stage(pages, parents), 1, [parents]),
+            ('extract', lambda: self._map_stage(parents, extracted, self._extract), self.stage_workers['extract'], [extracted]),
+            ('embed', lambda: self._map_stage(extracted, embedded, self._embed), self.stage_workers['embed'], [embedded]),
+            ('write', lambda: self._map_stage(embedded, None, self._write), 1, [])
+        ]
+        downstream_workers = [workers for _, _, workers, _ in stages[1:]] + [0]
+        
+        threads = []
+        for (name, target, workers, outboxes), next_workers in zip(stages, downstream_workers):
+            remaining = [workers]
+            lock = threading.Lock()
+            for i in range(workers):
+                thread = threading.Thread(
+                    target=self._run_worker,
+                    args=(target, remaining, lock, outboxes, next_workers),
+                    name=f"ingest-{name}-{i}",
+                    daemon=True
+                )
+                threads.append(thread)
+        
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            if self._extract_pool is not None:
+                self._extract_pool.shutdown()
+        
+        if self.log_path and self._report.files:
+            self._report.write_jsonl(self.log_path)
+        
+        if self._errors:
+            raise self._errors[0]
+        
+        return {
+            **self._stats,
+            'peak_buffered_bytes': self._budget.peak,
+            'ingestion_report': self._report.to_dict()
+        }
+    
+    def _run_worker(self, target: Callable, remaining: List[int], lock: threading.Lock,
+                    outboxes: List[queue.Queue], next_workers: int):
+        try:
+            target()
+        except IngestionAborted:
+            pass
+        except BaseException as e:
+            self._errors.append(e)
+            self._stop_event.set()
+        finally:
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                for outbox in outboxes:
+                    for _ in range(next_workers):
+                        self._put(outbox, _DONE, force=True)
+    
+    def _get(self, inbox: queue.Queue):
+        while True:
+            try:
+                return inbox.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop_event.is_set():
+                    raise IngestionAborted()
+    
+    def _put(self, outbox: queue.Queue, item, force: bool = False):
+        while True:
+            try:
+                outbox.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self._stop_event.is_set():
+                    if force:
+                        return
+                    raise IngestionAborted()
+    
+    def _load_stage(self, files: List[Path], outbox: queue.Queue):
+        documents = iter(self.document_loader.iter_page_documents(files))
+        while True:
+            started = time.perf_counter()
+            doc = next(documents, None)
+            if doc is None:
+                return
+            seconds = time.perf_counter() - started
+            page_count = 0
+            
+            pages = doc['pages']
+            loaded = isinstance(pages, list)
+            if loaded:
+                # pool workers hand back whole documents; hold their pages
+                # against the budget until each one is forwarded
+                self._budget.acquire(sum(len(text) for _, text in pages), self._stop_event, loaded=True)
+                pages = self._drain(pages)
+            
+            self._put(outbox, ('start', {key: value for key, value in doc.items() if key != 'pages'}))
+            pages = iter(pages)
+            while True:
+                started = time.perf_counter()
+                page = next(pages, None)
+                seconds += time.perf_counter() - started
+                if page is None:
+                    break
+                page_count += 1
+                self._put(outbox, ('page', page))
+                if loaded:
+                    self._budget.release(len(page[1]), loaded=True)
+            self._put(outbox, ('end', None))
+            
+            self._report.record(doc['filename'], 'load', seconds, bytes_read=doc.get('bytes', 0), pages=page_count)
+    
+    def _drain(self, pages: List) -> Iterator:
+        pages.reverse()
+        while pages:
+            yield pages.pop()
+    
+    def _page_stream(self, inbox: queue.Queue, waits: Dict) -> Iterator:
+        while True:
+            started = time.perf_counter()
+            message = self._get(inbox)
+            waits['seconds'] += time.perf_counter() - started
+            if message is _DONE:
+                raise IngestionAborted()
+            kind, payload = message
+            if kind == 'end':
+                return
+            yield payload
+    
+    def _chunk_stage(self, inbox: queue.Queue, outbox: queue.Queue):
+        while True:
+            message = self._get(inbox)
+            if message is _DONE:
+                return
+            _, doc = message
+            started = time.perf_counter()
+            waits = {'seconds': 0.0}
+            doc = {**doc, 'pages': self._page_stream(inbox, waits)}
+            chunk_count = 0
+            
+            group = []
+            for chunk in self.chunker.iter_document_chunks(doc):
+                if group and group[-1]['parent_id'] != chunk['parent_id']:
+                    waits['seconds'] += self._emit_parent(doc, group, outbox)
+                    group = []
+                group.append(chunk)
+                chunk_count += 1
+            if group:
+                waits['seconds'] += self._emit_parent(doc, group, outbox)
+            
+            seconds = time.perf_counter() - started - waits['seconds']
+            self._report.record(doc['filename'], 'chunk', seconds, chunks=chunk_count)
+    
+    def _emit_parent(self, doc: Dict, chunks: List[Dict], outbox: queue.Queue) -> float:
+        started = time.perf_counter()
+        size = len(chunks[0]['parent_text']) + sum(len(chunk['child_text']) for chunk in chunks)
+        self._budget.acquire(size, self._stop_event)
+        self._put(outbox, {
+            'filename': doc['filename'],
+            'source': doc['source'],
+            'chunks': chunks,
+            'size': size
+        })
+        return time.perf_counter() - started
+    
+    def _map_stage(self, inbox: queue.Queue, outbox: Optional[queue.Queue], fn: Callable):
+        while True:
+            item = self._get(inbox)
+            if item is _DONE:
+                return
+            result = fn(item)
+            if outbox is not None:
+                self._put(outbox, result)
+    
+    def _new_chunks(self, item: Dict) -> List[Dict]:
+        ids = [self.vector_store.chunk_store_id(chunk, item['filename']) for chunk in item['chunks']]
+        with self._seen_lock:
+            seen = self.chunk_ids_by_source.setdefault(item['source'], set())
+            unseen = []
+            for chunk_id, chunk in zip(ids, item['chunks']):
+                if chunk_id not in seen:
+                    seen.add(chunk_id)
+                    unseen.append((chunk_id, chunk))
+        
+        existing = self.vector_store.existing_chunk_ids([chunk_id for chunk_id, _ in unseen])
+        return [chunk for chunk_id, chunk in unseen if chunk_id not in existing]
+    
+    def _canonical_chunks(self, item: Dict) -> List[Dict]:
+        index = self.vector_store.near_duplicates
+        if index is None:
+            return item['chunks']
+        
+        # chunks the source held before this run may be pruned as stale once
+        # it ends, taking any same-source duplicates with them
+        with self._seen_lock:
+            if item['source'] not in self._stored_ids_by_source:
+                self._stored_ids_by_source[item['source']] = self.vector_store.source_chunk_ids(item['source'])
+            stale = _StaleIds(self._stored_ids_by_source[item['source']], self.chunk_ids_by_source[item['source']])
+        
+        chunks = []
+        for chunk in item['chunks']:
+            chunk_id = self.vector_store.chunk_store_id(chunk, item['filename'])
+            signature = index.signature(chunk['child_text'])
+            numbers = index.numbers_key(chunk['child_text'])
+            canonical_id = index.match_or_add(chunk_id, signature, numbers, exclude=stale)
+            if canonical_id is None:
+                chunk['simhash'] = f"{signature:016x}"
+                chunk['numhash'] = f"{numbers:016x}"
+                chunks.append(chunk)
+            else:
+                item['duplicates'].append((canonical_id, {
+                    'chunk_id': chunk_id,
+                    'filename': item['filename'],
+                    'source': item['source'],
+                    'page': chunk.get('page', 1)
+                }))
+        return chunks
+    
+    def _extract(self, item: Dict) -> Dict:
+        started = time.perf_counter()
+        chunk_count = len(item['chunks'])
+        item['chunks'] = self._new_chunks(item)
+        item['reused'] = chunk_count - len(item['chunks'])
+        item['duplicates'] = []
+        item['chunks'] = self._canonical_chunks(item)
+        item['entities'] = []
+        item['facts'] = []
+        if item['chunks']:
+            [(item['entities'], item['facts'])] = self.entity_extractor.extract_batch(
+                [item['chunks'][0]['parent_text']], executor=self._extract_pool)
+        self._report.record(item['filename'], 'extract', time.perf_counter() - started,
+                            chunks_reused=item['reused'], near_duplicates=len(item['duplicates']),
+                            entities=len(item['entities']), facts=len(item['facts']))
+        return item
+    
+    def _embed(self, item: Dict) -> Dict:
+        started = time.perf_counter()
+        texts = [chunk['child_text'] for chunk in item['chunks']]
+        item['new_entities'] = self.vector_store.new_entities(item['entities'])
+        texts.extend(self.vector_store.entity_document(entity) for entity in item['new_entities'])
+        texts.extend(self.vector_store.fact_document(fact) for fact in item['facts'])
+        item['embeddings'] = self.vector_store.embed(texts)
+        self._report.record(item['filename'], 'embed', time.perf_counter() - started,
+                            embedding_batches=1, embedded_texts=len(texts))
+        return item
+    
+    def _write(self, item: Dict):
+        filename = item['filename']
+        source = item['source']
+        embeddings = item['embeddings']
+        offset = len(item['chunks'])
+        started = time.perf_counter()
+        
+        try:
+            self.vector_store.add_chunks(item['chunks'], filename, source, embeddings[:offset])
+            self._stats['total_chunks'] += len(item['chunks'])
+            self._stats['chunks_reused'] += item['reused']
+            self._stats['near_duplicates'] += len(item['duplicates'])
+            for canonical_id, duplicate in item['duplicates']:
+                self.vector_store.add_provenance(canonical_id, duplicate)
+            
+            if item['chunks']:
+                parent = item['chunks'][0]
+                entities = item['entities']
+                new_entities = item['new_entities']
+                facts = item['facts']
+                
+                self.vector_store.add_entities(entities, parent['parent_id'], new_entities,
+                                               embeddings[offset:offset + len(new_entities)])
+                offset += len(new_entities)
+                self.vector_store.add_facts(facts, parent['parent_id'], filename, source,
+                                            embeddings[offset:offset + len(facts)])
+                
+                self._stats['total_entities'] += len(entities)
+                self._stats['entities_embedded'] += len(new_entities)
+                self._stats['total_facts'] += len(facts)
+                for entity in entities:
+                    entities_by_type = self._stats['entities_by_type']
+                    entities_by_type[entity.entity_type] = entities_by_type.get(entity.entity_type, 0) + 1
+            
+            self._report.record(filename, 'write', time.perf_counter() - started, rows_written=len(embeddings))
+        finally:
+            self._budget.release(item['size'])
@@ -0,0 +1,63 @@
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+STAGES = ['load', 'chunk', 'extract', 'embed', 'write']
+COUNTERS = ['bytes_read', 'pages', 'chunks', 'chunks_reused', 'near_duplicates', 'entities', 'facts', 'embedding_batches', 'embedded_texts', 'rows_written']
+
+
+class IngestionReport:
+    def __init__(self):
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.files: Dict[str, Dict] = {}
+        self.stages: Dict[str, Dict] = {stage: {'seconds': 0.0, 'items': 0} for stage in STAGES}
+        self._lock = threading.Lock()
+    
+    def _file(self, filename: str) -> Dict:
+        if filename not in self.files:
+            self.files[filename] = {
+                'filename': filename,
+                **{counter: 0 for counter in COUNTERS},
+                **{f"{stage}_seconds": 0.0 for stage in STAGES}
+            }
+        return self.files[filename]
+    
+    def record(self, filename: str, stage: str, seconds: float, **counters):
+        with self._lock:
+            file_record = self._file(filename)
+            file_record[f"{stage}_seconds"] += seconds
+            for counter, value in counters.items():
+                file_record[counter] += value
+            
+            stage_record = self.stages[stage]
+            stage_record['seconds'] += seconds
+            stage_record['items'] += 1
+            for counter, value in counters.items():
+                stage_record[counter] = stage_record.get(counter, 0) + value
+    
+    def file_records(self) -> List[Dict]:
+        records = []
+        for file_record in self.files.values():
+            total = sum(file_record[f"{stage}_seconds"] for stage in STAGES)
+            records.append({**file_record, 'total_seconds': total})
+        return sorted(records, key=lambda record: record['total_seconds'], reverse=True)
+    
+    def to_dict(self) -> Dict:
+        files = self.file_records()
+        return {
+            'started_at': self.started_at,
+            'stages': self.stages,
+            'files': files,
+            'slowest_files': [record['filename'] for record in files[:5]]
+        }
+    
+    def write_jsonl(self, log_path: str):
+        path = Path(log_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            for stage, stage_record in self.stages.items():
+                f.write(json.dumps({'type': 'stage', 'run': self.started_at, 'stage': stage, **stage_record}) + "\n")
+            for file_record in self.file_records():
+                f.write(json.dumps({'type': 'file', 'run': self.started_at, **file_record}) + "\n")
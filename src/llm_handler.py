@@ -15,6 +15,8 @@ class LLMHandler:
         self.llm_model = None
         self.llm_tokenizer = None
         self.current_model = None
+        self.slm_max_input_tokens = 512
+        self.llm_max_input_tokens = 1024
     
     def unload_models(self):
         if self.slm_model is not None:
@@ -92,12 +94,15 @@ Instructions:
 Answer:"""
         return prompt
     
-    def generate_with_slm(self, question: str, context: str) -> Dict:
+    def max_input_tokens(self, use_llm: bool = False) -> int:
+        return self.llm_max_input_tokens if use_llm else self.slm_max_input_tokens
+    
+    def generate_with_slm(self, question: str, context: str, truncate_context: bool = True) -> Dict:
         self.load_slm()
-        prompt = self.format_prompt(question, context[:2000])
+        prompt = self.format_prompt(question, context[:2000] if truncate_context else context)
         
         try:
-            inputs = self.slm_tokenizer(prompt, return_tensors="pt", truncation=True, max_length=512)
+            inputs = self.slm_tokenizer(prompt, return_tensors="pt", truncation=True, max_length=self.slm_max_input_tokens)
             
             with torch.no_grad():
                 outputs = self.slm_model.generate(
@@ -124,12 +129,12 @@ Answer:"""
                 'success': False
             }
     
-    def generate_with_llm(self, question: str, context: str) -> Dict:
+    def generate_with_llm(self, question: str, context: str, truncate_context: bool = True) -> Dict:
         self.load_llm()
-        prompt = self.format_prompt(question, context[:3000])
+        prompt = self.format_prompt(question, context[:3000] if truncate_context else context)
         
         try:
-            inputs = self.llm_tokenizer(prompt, return_tensors="pt", truncation=True, max_length=1024)
+            inputs = self.llm_tokenizer(prompt, return_tensors="pt", truncation=True, max_length=self.llm_max_input_tokens)
             
             with torch.no_grad():
                 outputs = self.llm_model.generate(
@@ -156,8 +161,8 @@ Answer:"""
                 'success': False
             }
     
-    def generate(self, question: str, context: str, use_llm: bool = False) -> Dict:
+    def generate(self, question: str, context: str, use_llm: bool = False, truncate_context: bool = True) -> Dict:
         if use_llm:
-            return self.generate_with_llm(question, context)
+            return self.generate_with_llm(question, context, truncate_context)
         else:
-            return self.generate_with_slm(question, context)
+            return self.generate_with_slm(question, context, truncate_context)
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+def hash_file(file_path: Path, block_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocumentManifest:
+    def __init__(self, manifest_path: str):
+        self.manifest_path = Path(manifest_path)
+        self.entries: Dict[str, Dict] = {}
+        self.load()
+    
+    def load(self):
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+    
+    def save(self):
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+    
+    def fingerprint(self, file_path: Path) -> Dict:
+        stat = file_path.stat()
+        return {
+            'path': str(file_path),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime
+        }
+    
+    def diff(self, files: Dict[str, Path]) -> Tuple[Dict[str, Dict], List[str]]:
+        changed = self.find_changed(files)
+        removed = [name for name in self.entries if name not in files]
+        return changed, removed
+    
+    def find_changed(self, files: Dict[str, Path]) -> Dict[str, Dict]:
+        changed = {}
+        
+        for name, file_path in files.items():
+            fingerprint = self.fingerprint(file_path)
+            entry = self.entries.get(name)
+            if entry and entry['size'] == fingerprint['size'] and entry['mtime'] == fingerprint['mtime']:
+                continue
+            
+            fingerprint['sha256'] = hash_file(file_path)
+            if entry and entry.get('sha256') == fingerprint['sha256']:
+                self.entries[name] = fingerprint
+                continue
+            
+            changed[name] = fingerprint
+        
+        return changed
+    
+    def update(self, name: str, fingerprint: Dict):
+        self.entries[name] = fingerprint
+    
+    def remove(self, name: str):
+        self.entries.pop(name, None)
+    
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,86 @@
+import hashlib
+import re
+import threading
+from typing import Container, Dict, List, Optional, Set
+
+WORD = re.compile(r"\w+")
+NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+class NearDuplicateIndex:
+    def __init__(self, max_distance: int = 3, shingle_size: int = 3, bits: int = 64):
+        self.max_distance = max_distance
+        self.shingle_size = shingle_size
+        self.bits = bits
+        self.bands = max_distance + 1
+        self.band_bits = bits // self.bands
+        self.signatures: Dict[str, int] = {}
+        self.numbers: Dict[str, int] = {}
+        self._buckets: List[Dict[int, Set[str]]] = [{} for _ in range(self.bands)]
+        self._lock = threading.Lock()
+
+    def signature(self, text: str) -> int:
+        words = WORD.findall(text.lower())
+        shingles = {" ".join(words[i:i + self.shingle_size])
+                    for i in range(max(len(words) - self.shingle_size + 1, 1))}
+        weights = [0] * self.bits
+        for shingle in shingles:
+            value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=self.bits // 8).digest(), 'big')
+            for bit in range(self.bits):
+                weights[bit] += 1 if value >> bit & 1 else -1
+        return sum(1 << bit for bit in range(self.bits) if weights[bit] > 0)
+
+    def numbers_key(self, text: str) -> int:
+        # chunks that differ in a figure (a count in an MIS row, an amount)
+        # are close in SimHash but must never collapse into one another
+        digest = hashlib.blake2b("\0".join(NUMBER.findall(text)).encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    def _band_keys(self, signature: int) -> List[int]:
+        mask = (1 << self.band_bits) - 1
+        return [signature >> (band * self.band_bits) & mask for band in range(self.bands)]
+
+    def find(self, signature: int, numbers: Optional[int], exclude: Container[str] = ()) -> Optional[str]:
+        best_id = None
+        best_distance = self.max_distance + 1
+        for band, key in enumerate(self._band_keys(signature)):
+            for chunk_id in self._buckets[band].get(key, ()):
+                if chunk_id in exclude or self.numbers.get(chunk_id) != numbers:
+                    continue
+                distance = bin(signature ^ self.signatures[chunk_id]).count('1')
+                if distance < best_distance or (distance == best_distance and best_id is not None and chunk_id < best_id):
+                    best_id, best_distance = chunk_id, distance
+        return best_id
+
+    def add(self, chunk_id: str, signature: int, numbers: Optional[int]):
+        self.signatures[chunk_id] = signature
+        if numbers is not None:
+            self.numbers[chunk_id] = numbers
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(key, set()).add(chunk_id)
+
+    def remove(self, chunk_id: str):
+        signature = self.signatures.pop(chunk_id, None)
+        self.numbers.pop(chunk_id, None)
+        if signature is None:
+            return
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(chunk_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def match_or_add(self, chunk_id: str, signature: int, numbers: int,
+                     exclude: Container[str] = ()) -> Optional[str]:
+        with self._lock:
+            canonical_id = self.find(signature, numbers, exclude)
+            if canonical_id is None:
+                self.add(chunk_id, signature, numbers)
+            return canonical_id
+
+    def clear(self):
+        with self._lock:
+            self.signatures.clear()
+            self.numbers.clear()
+            self._buckets = [{} for _ in range(self.bands)]
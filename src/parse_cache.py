@@ -0,0 +1,82 @@
+import hashlib
+import json
+import mmap
+import os
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from src.manifest import hash_file
+
+
+class ParsedTextCache:
+    def __init__(self, cache_dir: str, compression_level: int = 6, block_size: int = 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.compression_level = compression_level
+        self.block_size = block_size
+        self._content_hashes: Dict[str, Tuple[int, float, str]] = {}
+    
+    def remember(self, fingerprint: Dict):
+        # the manifest has already hashed the file; the memo is pickled along
+        # with the loader, so pool workers reuse it instead of re-hashing
+        if 'sha256' in fingerprint:
+            self._content_hashes[fingerprint['path']] = (fingerprint['size'], fingerprint['mtime'], fingerprint['sha256'])
+    
+    def content_hash(self, file_path: Path) -> str:
+        stat = file_path.stat()
+        size, mtime, digest = self._content_hashes.get(str(file_path), (None, None, None))
+        if (size, mtime) != (stat.st_size, stat.st_mtime):
+            digest = hash_file(file_path)
+            self._content_hashes[str(file_path)] = (stat.st_size, stat.st_mtime, digest)
+        return digest
+    
+    def _file_key(self, file_path: Path) -> str:
+        return hashlib.sha256(str(file_path).encode('utf-8')).hexdigest()[:16]
+    
+    def entry_for(self, file_path: Path, member: Optional[str], variant: str) -> Path:
+        unit_key = hashlib.sha256(f"{member or ''}|{variant}".encode('utf-8')).hexdigest()[:16]
+        return self.cache_dir / f"{self._file_key(file_path)}{unit_key}_{self.content_hash(file_path)}.z"
+    
+    def remove(self, file_path: Path):
+        self._content_hashes.pop(str(file_path), None)
+        for entry in self.cache_dir.glob(f"{self._file_key(file_path)}*.z"):
+            entry.unlink(missing_ok=True)
+    
+    def read(self, entry: Path) -> Iterator[Tuple[int, str]]:
+        with open(entry, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            decompressor = zlib.decompressobj()
+            pending = b""
+            with memoryview(mapped) as view:
+                for offset in range(0, len(view), self.block_size):
+                    pending += decompressor.decompress(view[offset:offset + self.block_size])
+                    *lines, pending = pending.split(b"\n")
+                    for line in lines:
+                        yield tuple(json.loads(line))
+            pending += decompressor.flush()
+            for line in pending.split(b"\n"):
+                if line:
+                    yield tuple(json.loads(line))
+    
+    def write(self, entry: Path, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry.with_suffix(f".{os.getpid()}.tmp")
+        compressor = zlib.compressobj(self.compression_level)
+        try:
+            with open(tmp_path, 'wb') as f:
+                for page_number, text in pages:
+                    f.write(compressor.compress((json.dumps([page_number, text]) + "\n").encode('utf-8')))
+                    yield page_number, text
+                f.write(compressor.flush())
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        
+        os.replace(tmp_path, entry)
+        name_key = entry.name.split('_', 1)[0]
+        for stale in self.cache_dir.glob(f"{name_key}_*.z"):
+            if stale != entry:
+                stale.unlink(missing_ok=True)
+    
+    def cached_pages(self, entry: Path, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+        if entry.exists():
+            return self.read(entry)
+        return self.write(entry, pages)
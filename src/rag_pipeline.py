@@ -17,25 +17,24 @@ class RAGPipeline:
         self.is_initialized = False
     
     def initialize(self) -> Dict:
-        documents = self.document_loader.load_all_documents()
+        files = self.document_loader.list_files()
         
-        if not documents:
+        if not files:
             return {
                 'success': False,
                 'message': 'No documents found in the documents folder',
                 'document_count': 0
             }
         
-        hierarchical_data = self.chunker.create_hierarchical_chunks(documents)
-        self.vector_store.add_documents(hierarchical_data)
+        records = self.chunker.iter_hierarchical_chunks(self.document_loader.iter_documents())
+        counts = self.vector_store.add_hierarchical_stream(records)
         self.is_initialized = True
         
         return {
             'success': True,
             'message': 'Documents loaded and indexed successfully',
-            'document_count': len(documents),
-            'parent_chunks': len(hierarchical_data['parent_chunks']),
-            'child_chunks': len(hierarchical_data['child_chunks'])
+            'document_count': len(self.document_loader.list_units(files)) - len(self.document_loader.errors),
+            **counts
         }
     
     def query(self, question: str) -> Dict:
@@ -0,0 +1,165 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+
+ROLES = ('ORGANIZATION', 'DATE', 'CATEGORY', 'COUNT')
+IDENTITY_ROLES = ('ORGANIZATION', 'DATE')
+LINE = re.compile(r'[^\n]*\n|[^\n]+')
+RECORD_START = re.compile(r'[^=;\n]+=')
+# a field runs to the next "; " that is not escaped by the loader
+FIELD = re.compile(r'((?:\\.|;(?! )|[^;\\\n])*)(?:; |\n|$)')
+NAME = re.compile(r'(?:\\.|[^=\\])*=')
+ESCAPE = re.compile(r'\\(.)')
+
+Row = Tuple[int, int, Dict[str, Tuple[str, int, int]]]
+
+
+def unescape_field(text: str) -> str:
+    return ESCAPE.sub(r'\1', text) if '\\' in text else text
+
+
+@dataclass
+class TableSchema:
+    name: str
+    columns: Dict[str, str]
+    date_format: Optional[str] = None
+
+    def __post_init__(self):
+        for column, role in self.columns.items():
+            if role not in ROLES:
+                raise ValueError(f"Unknown role {role!r} for column {column!r}; expected one of {ROLES}")
+
+    @property
+    def required_columns(self) -> List[str]:
+        return [column for column, role in self.columns.items() if role in IDENTITY_ROLES]
+
+    @property
+    def subject_column(self) -> Optional[str]:
+        return next((column for column, role in self.columns.items() if role == 'ORGANIZATION'), None)
+
+
+AGEING_COUNTS = {column: 'COUNT' for column in ('Days_0_to_7', 'Days_8_to_15', 'Days_16_to_31', 'Days_32_to_90',
+                                                'Days_91_to_180', 'Days_181_to_365', 'more_than_366_days')}
+
+DEFAULT_TABLE_SCHEMAS = [
+    TableSchema('pcra_top_pending', {
+        'CHO_wise_pending': 'ORGANIZATION',
+        'Date': 'DATE',
+        'Category': 'CATEGORY',
+        'Outstanding_at_the_End_of_Month': 'COUNT',
+        **AGEING_COUNTS
+    }, date_format='%d-%m-%Y'),
+    TableSchema('ccra_monthly_mis', {
+        'Entities': 'ORGANIZATION',
+        'Month': 'DATE',
+        'Outstanding_Opening_Balance': 'COUNT',
+        'Escalated_to_NPST': 'COUNT',
+        'Referrals_received_during_month': 'COUNT',
+        'Reviewed_and_assigned_by_NPST': 'COUNT',
+        'Referrals_resolved_during_month': 'COUNT',
+        'Outstanding_at_the_end_of_month': 'COUNT'
+    }, date_format='%m/%d/%Y'),
+    TableSchema('ccra_ageing_summary', {
+        'Name_of_Entity': 'ORGANIZATION',
+        'Sector_Type': 'CATEGORY',
+        'Date': 'DATE',
+        'Reported_Referrals': 'COUNT',
+        'Days_60_to_180': 'COUNT',
+        'Days_181_to_365': 'COUNT',
+        'more_than_366_days': 'COUNT'
+    }, date_format='%Y-%m-%d')
+]
+
+
+class TabularEntityExtractor:
+    def __init__(self, schemas: List[TableSchema], confidence: float = 1.0):
+        self.schemas = schemas
+        self.confidence = confidence
+
+    def parse_rows(self, text: str) -> List[Row]:
+        rows = []
+        for line in LINE.finditer(text):
+            fields = {}
+            for field in FIELD.finditer(text, line.start(), line.end()):
+                name = NAME.match(field.group(1))
+                if name:
+                    value = field.group(1)[name.end():]
+                    fields[unescape_field(name.group()[:-1])] = (unescape_field(value), field.start(1) + name.end(), len(value))
+                if field.end() == line.end():
+                    break
+            rows.append((line.start(), line.end(), fields))
+        return rows
+
+    def match_schema(self, fields: Dict) -> Optional[int]:
+        for index, schema in enumerate(self.schemas):
+            if all(column in fields for column in schema.required_columns):
+                return index
+        return None
+
+    def extract(self, text: str) -> Optional[Tuple[List[tuple], List[tuple], List[Tuple[int, int]]]]:
+        if not self.schemas or not RECORD_START.match(text):
+            return None
+
+        groups: Dict[int, List[Row]] = {}
+        unmatched: List[Tuple[int, int]] = []
+        for row in self.parse_rows(text):
+            schema_index = self.match_schema(row[2])
+            if schema_index is not None:
+                groups.setdefault(schema_index, []).append(row)
+            elif unmatched and unmatched[-1][1] == row[0]:
+                unmatched[-1] = (unmatched[-1][0], row[1])
+            else:
+                unmatched.append((row[0], row[1]))
+        if not groups:
+            return None
+
+        entity_rows: List[tuple] = []
+        fact_rows: List[tuple] = []
+        for schema_index, rows in groups.items():
+            self._extract_rows(text, self.schemas[schema_index], rows, entity_rows, fact_rows)
+        return entity_rows, fact_rows, unmatched
+
+    def _typed_columns(self, schema: TableSchema, rows: List[Row]) -> Dict[str, List]:
+        raw = {column: [fields[column][0].strip() or None if column in fields else None for _, _, fields in rows]
+               for column in schema.columns}
+        columns = {}
+        # all COUNT cells are converted in one to_numeric call and split back per
+        # column; unparseable cells come back as NaN
+        count_columns = [column for column, role in schema.columns.items() if role == 'COUNT']
+        if count_columns:
+            numbers = pd.to_numeric([value for column in count_columns for value in raw[column]], errors='coerce').tolist()
+            for i, column in enumerate(count_columns):
+                columns[column] = numbers[i * len(rows):(i + 1) * len(rows)]
+        for column, role in schema.columns.items():
+            if role == 'DATE':
+                parsed = pd.to_datetime(raw[column], format=schema.date_format, errors='coerce')
+                columns[column] = parsed.strftime('%Y-%m-%d').tolist()
+            elif role != 'COUNT':
+                columns[column] = raw[column]
+        return columns
+
+    def _extract_rows(self, text: str, schema: TableSchema, rows: List[Row],
+                      entity_rows: List[tuple], fact_rows: List[tuple]):
+        columns = self._typed_columns(schema, rows)
+        subject_column = schema.subject_column
+
+        for index, (start, end, fields) in enumerate(rows):
+            subject = columns[subject_column][index] if subject_column else None
+            source_text = text[start:end].strip()
+            for column, role in schema.columns.items():
+                value = columns[column][index]
+                if value is None or value != value:
+                    continue
+                if role == 'COUNT':
+                    if subject:
+                        count = str(int(value)) if float(value).is_integer() else f"{value:g}"
+                        fact_rows.append((subject, column.lower(), count, source_text, self.confidence))
+                    continue
+
+                _, value_start, length = fields[column]
+                entity_rows.append((value, role, value_start, value_start + length, self.confidence))
+                if subject and role == 'DATE':
+                    fact_rows.append((subject, 'dated', value, source_text, self.confidence))
+                elif subject and role == 'CATEGORY':
+                    fact_rows.append((subject, f"has_{column.lower()}", value, source_text, self.confidence))
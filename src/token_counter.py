@@ -0,0 +1,29 @@
+import os
+from typing import List, Sequence, Tuple
+from tokenizers import Tokenizer
+
+MODELS_CONFIG_DIR = os.path.join(os.path.dirname(__file__), '..', 'models_config')
+
+
+class TokenCounter:
+    def __init__(self, tokenizer_path: str, batch_size: int = 64):
+        self.tokenizer_path = tokenizer_path
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.batch_size = batch_size
+
+    @classmethod
+    def for_model(cls, model: str = 'slm', config_dir: str = MODELS_CONFIG_DIR, **kwargs) -> 'TokenCounter':
+        return cls(os.path.join(config_dir, model, 'tokenizer.json'), **kwargs)
+
+    def offsets_batch(self, texts: Sequence[str]) -> List[List[Tuple[int, int]]]:
+        offsets = []
+        for i in range(0, len(texts), self.batch_size):
+            encodings = self.tokenizer.encode_batch(list(texts[i:i + self.batch_size]), add_special_tokens=False)
+            offsets.extend([(start, end) for start, end in encoding.offsets if end > start] for encoding in encodings)
+        return offsets
+
+    def count_batch(self, texts: Sequence[str]) -> List[int]:
+        return [len(offsets) for offsets in self.offsets_batch(texts)]
+
+    def count(self, text: str) -> int:
+        return self.count_batch([text])[0]
@@ -0,0 +1,78 @@
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%m-%d-%Y', '%d-%m-%y', '%m-%d-%y',
+                '%d %b %Y', '%d %B %Y', '%d %b %y', '%d %B %y',
+                '%b %d %Y', '%B %d %Y', '%b %d %y', '%B %d %y')
+CURRENCY = re.compile(r'^(?:Rs\.?|INR|\$|₹)\s*', re.IGNORECASE)
+
+IndexEntry = Tuple[Any, str, str]
+
+
+def normalize_date(text: str) -> Optional[str]:
+    # day-first formats are tried before month-first ones, so 03/04/2025 is
+    # read as 3 April; 25/12/2025 still parses because 25 cannot be a month
+    value = ' '.join(text.replace('/', '-').replace(',', ' ').split())
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def normalize_money(text: str) -> Optional[float]:
+    try:
+        return float(CURRENCY.sub('', text.strip()).replace(',', ''))
+    except ValueError:
+        return None
+
+
+class TypedIndex:
+    def __init__(self, normalize: Callable[[str], Optional[Any]]):
+        self.normalize = normalize
+        self._entries: Dict[str, Tuple[Any, str]] = {}
+        self._keys: List[Any] = []
+        self._sorted: List[IndexEntry] = []
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, value: Any, item_id: str, text: str):
+        with self._lock:
+            self._entries[item_id] = (value, text)
+            self._dirty = True
+
+    def remove(self, item_ids: Set[str]):
+        with self._lock:
+            for item_id in item_ids:
+                if self._entries.pop(item_id, None) is not None:
+                    self._dirty = True
+
+    def range(self, low: Any = None, high: Any = None) -> List[IndexEntry]:
+        with self._lock:
+            # writes only mark the index dirty; the sorted arrays are rebuilt
+            # on the next lookup so a whole ingestion batch costs one sort
+            if self._dirty:
+                self._sorted = sorted((value, item_id, text) for item_id, (value, text) in self._entries.items())
+                self._keys = [entry[0] for entry in self._sorted]
+                self._dirty = False
+            lo = bisect_left(self._keys, low) if low is not None else 0
+            hi = bisect_right(self._keys, high) if high is not None else len(self._keys)
+            return self._sorted[lo:hi]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys = []
+            self._sorted = []
+            self._dirty = False
+
+
+def default_typed_indexes() -> Dict[str, TypedIndex]:
+    return {'DATE': TypedIndex(normalize_date), 'MONEY': TypedIndex(normalize_money)}
@@ -1,7 +1,7 @@
 import chromadb
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict
+from typing import Dict, Iterable, List
 import os
 
 
@@ -20,8 +20,37 @@ class VectorStore:
     def add_documents(self, hierarchical_data: Dict):
         self.parent_chunks = hierarchical_data['parent_chunks']
         self.child_to_parent_map = hierarchical_data['child_to_parent_map']
-        child_chunks = hierarchical_data['child_chunks']
+        self._add_child_chunks(hierarchical_data['child_chunks'])
+    
+    def add_hierarchical_stream(self, records: Iterable[Dict], batch_size: int = 64) -> Dict:
+        self.parent_chunks = {}
+        self.child_to_parent_map = {}
+        batch = []
+        child_count = 0
+        
+        for record in records:
+            self.parent_chunks[record['parent_id']] = {
+                'text': record['text'],
+                'filename': record['filename']
+            }
+            for child in record['child_chunks']:
+                self.child_to_parent_map[child['id']] = record['parent_id']
+                batch.append(child)
+            
+            if len(batch) >= batch_size:
+                self._add_child_chunks(batch)
+                child_count += len(batch)
+                batch = []
+        
+        self._add_child_chunks(batch)
+        child_count += len(batch)
         
+        return {
+            'parent_chunks': len(self.parent_chunks),
+            'child_chunks': child_count
+        }
+    
+    def _add_child_chunks(self, child_chunks: List[Dict]):
         if not child_chunks:
             return
         
@@ -29,15 +58,14 @@ class VectorStore:
         texts = [chunk['text'] for chunk in child_chunks]
         metadatas = [{'parent_id': chunk['parent_id'], 'filename': chunk['filename']} for chunk in child_chunks]
         
-        embeddings = self.embedding_model.encode(texts).tolist()
-        
-        existing_ids = set(self.collection.get()['ids'])
+        existing_ids = set(self.collection.get(ids=ids, include=[])['ids'])
         new_indices = [i for i, id in enumerate(ids) if id not in existing_ids]
         
         if new_indices:
+            embeddings = self.embedding_model.encode([texts[i] for i in new_indices]).tolist()
             self.collection.add(
                 ids=[ids[i] for i in new_indices],
-                embeddings=[embeddings[i] for i in new_indices],
+                embeddings=embeddings,
                 documents=[texts[i] for i in new_indices],
                 metadatas=[metadatas[i] for i in new_indices]
             )